@@ -0,0 +1,263 @@
+"""
+Aggregate queries backing the dashboard view.
+
+Every figure the dashboard shows is derived from a handful of grouped SQL
+statements over the daily_totals rollup using conditional aggregation, so
+the cost of a page load scales with days of history rather than entries.
+"""
+from datetime import date, timedelta
+from sqlalchemy import func, case, select
+from models import db, DailyTotal, Entry, Settings, Worker
+
+
+def _sum_where(condition, column):
+    """SUM(column) restricted to rows matching condition (0.0 when none match)"""
+    return func.coalesce(func.sum(case((condition, column), else_=0.0)), 0.0)
+
+
+def _count_distinct_dates_where(condition):
+    """COUNT(DISTINCT date) restricted to rows matching condition"""
+    return func.count(func.distinct(case((condition, DailyTotal.date))))
+
+
+def _rollup_filter(query, user_id, worker_filter):
+    """Apply the user and optional worker filter shared by all dashboard queries"""
+    query = query.filter(DailyTotal.user_id == user_id)
+    if worker_filter != 'all':
+        query = query.filter(DailyTotal.worker_id == worker_filter)
+    return query
+
+
+def get_worker_stats(user_id, worker_filter='all'):
+    """Per-worker entry count, revenue, hours and last active date in one grouped join.
+
+    Args:
+        user_id: Owner of the entries
+        worker_filter: Worker id or 'all'
+
+    Returns:
+        Dict mapping worker name ('Unassigned' for entries without a worker)
+        to a dict with worker_id, count, revenue, hours and last_date,
+        ordered by name
+    """
+    rows = _rollup_filter(db.session.query(
+        DailyTotal.worker_id,
+        Worker.name,
+        func.sum(DailyTotal.entry_count),
+        func.sum(DailyTotal.revenue),
+        func.sum(DailyTotal.hours),
+        func.max(DailyTotal.date),
+    ).outerjoin(Worker, Worker.id == DailyTotal.worker_id), user_id, worker_filter).group_by(
+        DailyTotal.worker_id
+    ).order_by(Worker.name).all()
+
+    worker_stats = {}
+    for worker_id, worker_name, count, revenue, hours, last_date in rows:
+        worker_stats[worker_name or 'Unassigned'] = {
+            'worker_id': worker_id,
+            'count': count,
+            'revenue': revenue or 0.0,
+            'hours': hours or 0.0,
+            'last_date': last_date
+        }
+    return worker_stats
+
+
+def get_dashboard_summary(user_id, worker_filter='all', recent_start=None, today=None):
+    """Compute the raw dashboard figures for a user.
+
+    Args:
+        user_id: Owner of the entries
+        worker_filter: Worker id or 'all'
+        recent_start: First day of the "recent average" period (inclusive)
+        today: Reference date (defaults to today)
+
+    Returns:
+        Dict of totals, period sums, worker breakdown and best day
+    """
+    if today is None:
+        today = date.today()
+    if recent_start is None:
+        recent_start = today - timedelta(days=6)
+    month_start = date(today.year, today.month, 1)
+    trend_start = today - timedelta(days=29)
+    previous_trend_start = trend_start - timedelta(days=30)
+
+    in_recent = DailyTotal.date.between(recent_start, today)
+    in_trend = DailyTotal.date.between(trend_start, today)
+    in_previous_trend = (DailyTotal.date >= previous_trend_start) & (DailyTotal.date < trend_start)
+    in_month = DailyTotal.date.between(month_start, today)
+    is_today = DailyTotal.date == today
+
+    # Totals and every date-bounded sum in a single pass
+    totals = _rollup_filter(db.session.query(
+        func.coalesce(func.sum(DailyTotal.revenue), 0.0),
+        func.coalesce(func.sum(DailyTotal.hours), 0.0),
+        func.coalesce(func.sum(DailyTotal.entry_count), 0),
+        _sum_where(in_recent, DailyTotal.revenue),
+        _sum_where(in_recent, DailyTotal.hours),
+        _count_distinct_dates_where(in_recent),
+        _sum_where(in_trend, DailyTotal.revenue),
+        _sum_where(in_previous_trend, DailyTotal.revenue),
+        _sum_where(is_today, DailyTotal.revenue),
+        _sum_where(in_month, DailyTotal.revenue),
+        _count_distinct_dates_where(in_month),
+    ), user_id, worker_filter).one()
+
+    # Worker breakdown
+    worker_stats = get_worker_stats(user_id, worker_filter)
+
+    # Best day: the highest-revenue day across the filtered workers (earliest wins ties)
+    day_revenue = func.sum(DailyTotal.revenue)
+    best = _rollup_filter(
+        db.session.query(
+            DailyTotal.date,
+            day_revenue.label('revenue'),
+            func.sum(DailyTotal.hours).label('hours')
+        ),
+        user_id, worker_filter
+    ).group_by(DailyTotal.date).having(day_revenue > 0).order_by(day_revenue.desc(), DailyTotal.date).first()
+
+    return {
+        'total_revenue': totals[0],
+        'total_hours': totals[1],
+        'entry_count': totals[2],
+        'recent_revenue': totals[3],
+        'recent_hours': totals[4],
+        'recent_days_worked': totals[5],
+        'trend_revenue': totals[6],
+        'previous_trend_revenue': totals[7],
+        'daily_revenue': totals[8],
+        'monthly_revenue': totals[9],
+        'days_worked_this_month': totals[10],
+        'worker_stats': worker_stats,
+        'best_day': best.date if best else None,
+        'best_day_revenue': best.revenue if best else 0.0,
+        'best_day_hours': best.hours if best else 0.0,
+    }
+
+
+# SQL expressions mapping a rollup date to its chart bucket key
+CHART_BUCKETS = {
+    'daily': lambda column: func.strftime('%Y-%m-%d', column),
+    # Monday of the (ISO) week the date falls in
+    'weekly': lambda column: func.date(column, 'weekday 0', '-6 days'),
+    'monthly': lambda column: func.strftime('%Y-%m', column),
+}
+
+
+# Python equivalents of CHART_BUCKETS, for bucketing rows already fetched
+CHART_BUCKET_KEYS = {
+    'daily': lambda day: day.isoformat(),
+    'weekly': lambda day: (day - timedelta(days=day.weekday())).isoformat(),
+    'monthly': lambda day: f'{day.year}-{day.month:02d}',
+}
+
+
+def chart_window_start(period, today):
+    """First day covered by a chart period ending today (30 days, 12 weeks or 12 months)"""
+    if period == 'daily':
+        return today - timedelta(days=29)
+    if period == 'weekly':
+        return today - timedelta(weeks=11)
+    return today - timedelta(days=365)
+
+
+def get_chart_buckets(user_id, worker_filter, period, start_date, end_date):
+    """Sum revenue and hours per chart bucket between two dates (inclusive).
+
+    Args:
+        user_id: Owner of the entries
+        worker_filter: Worker id or 'all'
+        period: 'daily', 'weekly' or 'monthly'
+        start_date: First day included
+        end_date: Last day included
+
+    Returns:
+        Dict mapping bucket key ('YYYY-MM-DD' day, 'YYYY-MM-DD' Monday of
+        the week, or 'YYYY-MM' month) to a (revenue, hours) tuple
+    """
+    bucket = CHART_BUCKETS[period](DailyTotal.date).label('bucket')
+    rows = _rollup_filter(db.session.query(
+        bucket,
+        func.sum(DailyTotal.revenue),
+        func.sum(DailyTotal.hours),
+    ), user_id, worker_filter).filter(
+        DailyTotal.date >= start_date,
+        DailyTotal.date <= end_date
+    ).group_by(bucket).all()
+    return {key: (revenue or 0.0, hours or 0.0) for key, revenue, hours in rows}
+
+
+def get_all_chart_buckets(user_id, worker_filter, today):
+    """Chart buckets for every period, overall and per worker, from one pass over the rollup.
+
+    Reads each rollup row of the widest chart window once and adds it to
+    the daily, weekly and monthly buckets its date falls in (within that
+    period's own window), so the sums match get_chart_buckets exactly.
+
+    Returns:
+        Tuple of (totals, per_worker): totals maps period to a bucket dict
+        as returned by get_chart_buckets; per_worker maps worker id (None
+        for unassigned entries) to the same structure
+    """
+    starts = {period: chart_window_start(period, today) for period in CHART_BUCKET_KEYS}
+    rows = _rollup_filter(db.session.query(
+        DailyTotal.worker_id,
+        DailyTotal.date,
+        DailyTotal.revenue,
+        DailyTotal.hours,
+    ), user_id, worker_filter).filter(
+        DailyTotal.date >= min(starts.values()),
+        DailyTotal.date <= today
+    ).all()
+
+    totals = {period: {} for period in CHART_BUCKET_KEYS}
+    per_worker = {}
+    for worker_id, day, revenue, hours in rows:
+        worker_buckets = per_worker.setdefault(worker_id, {period: {} for period in CHART_BUCKET_KEYS})
+        for period, bucket_key in CHART_BUCKET_KEYS.items():
+            if day < starts[period]:
+                continue
+            key = bucket_key(day)
+            for buckets in (totals[period], worker_buckets[period]):
+                bucket = buckets.setdefault(key, [0.0, 0.0])
+                bucket[0] += revenue
+                bucket[1] += hours
+
+    def as_tuples(by_period):
+        return {period: {key: tuple(sums) for key, sums in buckets.items()} for period, buckets in by_period.items()}
+
+    return as_tuples(totals), {worker_id: as_tuples(buckets) for worker_id, buckets in per_worker.items()}
+
+
+def count_entries(user_id, worker_filter='all'):
+    """Number of entries for a user (and optional worker), summed from the daily rollup"""
+    return _rollup_filter(
+        db.session.query(func.coalesce(func.sum(DailyTotal.entry_count), 0)),
+        user_id, worker_filter
+    ).scalar()
+
+
+def get_data_version(user_id):
+    """Cheap fingerprint of the data the dashboard and charts are computed from.
+
+    It changes whenever an entry is added, edited or deleted (entry count and
+    latest entry update) or anything is saved on the settings page, which
+    bumps settings.updated_at. Rollup rebuilds and the worker_id backfill
+    bump settings.updated_at as well. One statement of index lookups.
+
+    Returns:
+        Tuple of (version string, last modified datetime or None)
+    """
+    entry_count = select(func.coalesce(func.sum(DailyTotal.entry_count), 0)).where(
+        DailyTotal.user_id == user_id
+    ).scalar_subquery()
+    last_entry_update = select(func.max(Entry.updated_at)).where(Entry.user_id == user_id).scalar_subquery()
+    settings_update = select(Settings.updated_at).where(Settings.user_id == user_id).scalar_subquery()
+    count, last_entry, last_settings = db.session.execute(
+        select(entry_count, last_entry_update, settings_update)
+    ).one()
+
+    last_modified = max((t for t in (last_entry, last_settings) if t is not None), default=None)
+    return f'{count}:{last_entry}:{last_settings}', last_modified
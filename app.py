@@ -1,13 +1,36 @@
-from flask import Flask, render_template, request, redirect, url_for, flash, jsonify, session
+from flask import (Flask, render_template, request, redirect, url_for, flash, jsonify, session, Response,
+                   stream_with_context, make_response, after_this_request, send_file)
 from flask_login import LoginManager, login_user, logout_user, login_required, current_user
 from flask_migrate import Migrate
+import click
 from datetime import datetime, date, timedelta
-from sqlalchemy import func, extract
-from sqlalchemy.exc import OperationalError
-from models import db, User, Entry, Settings, Worker
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import joinedload
+from models import db, User, Entry, Settings, Worker, Holiday
+from analytics import (get_dashboard_summary, get_chart_buckets, get_all_chart_buckets, get_worker_stats,
+                       count_entries, get_data_version, chart_window_start, CHART_BUCKETS)
+import rollup
+from cache import LRUCache
+from workdays import get_month_workday_stats
+from user_settings import get_settings, get_settings_row, invalidate_settings
+from identity import load_identity
+from pagination import keyset_paginate
+from entry_batch import (apply_entry_batch, BatchError, request_hash, find_idempotent_response,
+                         store_idempotent_response, MAX_IDEMPOTENCY_KEY_LENGTH)
+from entry_io import validate_entry_values, import_entries_csv, iter_export_rows, serialize_entries, EXPORT_FORMATS
 from config import get_config
+from sqlite_tuning import init_sqlite_tuning, current_pragmas
+from schema import ensure_schema
+from backfill import backfill_status, BACKFILL_BATCH_SIZE
+from metrics import init_metrics, render_metrics
+from slow_queries import init_slow_query_log
+from profiler import (init_profiler, is_admin, is_profiling, list_profiles, get_profile, profile_path,
+                      profile_summary, PROFILE_PARAMETER)
 from calendar import monthrange
+import io
 import os
+import hashlib
+import hmac
 import json
 import math
 import locale
@@ -42,88 +65,106 @@ def number_filter(value, decimals=0):
 
 # Initialize extensions
 db.init_app(app)
+init_sqlite_tuning(app, db)
+if app.config['METRICS_ENABLED']:
+    init_metrics(app, db)
+init_slow_query_log(app, db)
+init_profiler(app)
 migrate = Migrate(app, db)
 login_manager = LoginManager()
 login_manager.init_app(app)
 login_manager.login_view = 'login'
 login_manager.login_message = 'Please log in to access this page.'
 
+# Computed dashboard metrics and chart payloads, keyed by (user_id, ..., data version)
+result_cache = LRUCache(app.config['RESULT_CACHE_SIZE'])
 
-@login_manager.user_loader
-def load_user(user_id):
-    """Load user for Flask-Login"""
-    return User.query.get(int(user_id))
 
+def invalidate_user_cache(user_id):
+    """Drop cached results for a user after any write to their data (frees memory early;
+    versioned keys already keep other processes from serving stale results)"""
+    result_cache.invalidate_user(user_id)
 
-def _count_workdays(start_date, end_date, workdays_of_week=None):
-    """Count workdays between two dates inclusive based on specified days of week.
-    
-    Args:
-        start_date: Start date
-        end_date: End date
-        workdays_of_week: List of weekday numbers (0=Monday, 6=Sunday) or None for default Mon-Fri
+
+def touch_settings(user_id):
+    """Mark the user's settings as changed (workers and holidays are part of the data version)"""
+    Settings.query.filter_by(user_id=user_id).update({'updated_at': datetime.utcnow()})
+
+
+# Part of every ETag, so pages cached by browsers before a restart (e.g. a deploy) are not reused
+_etag_salt = datetime.utcnow().isoformat()
+
+
+def _data_validators(*variant):
+    """ETag and Last-Modified for the current user's data, today, for one variant of a page"""
+    version, last_modified = get_data_version(current_user.id)
+    raw = ':'.join(str(part) for part in (_etag_salt, current_user.id, date.today(), version) + variant)
+    return hashlib.sha1(raw.encode()).hexdigest()[:24], last_modified
+
+
+def _with_validators(response, etag, last_modified):
+    """Attach validators; browsers must revalidate, but may reuse the body on a 304"""
+    response.set_etag(etag)
+    if last_modified:
+        response.last_modified = last_modified
+    response.cache_control.private = True
+    response.cache_control.no_cache = True
+    return response
+
+
+def _cached_result(key):
+    """result_cache.get(), except for profiled requests, which compute their result afresh"""
+    return None if is_profiling() else result_cache.get(key)
+
+
+def _not_modified(etag, last_modified):
+    """A 304 response when the browser already has this version, else None.
+
+    Only the ETag decides: Last-Modified does not move when an entry is
+    deleted, so If-Modified-Since alone is not trusted.
     """
-    if start_date > end_date:
-        return 0
-    
-    # Default to Monday-Friday if not specified
-    if workdays_of_week is None:
-        workdays_of_week = [0, 1, 2, 3, 4]  # Mon-Fri
-    
-    delta = end_date - start_date
-    workday_count = 0
-    for days in range(delta.days + 1):
-        current_day = start_date + timedelta(days=days)
-        if current_day.weekday() in workdays_of_week:
-            workday_count += 1
-    return workday_count
+    if '_flashes' in session:
+        # Pending flash messages have to be rendered
+        return None
+    if is_profiling():
+        return None
+    if etag in request.if_none_match:
+        return _with_validators(app.response_class(status=304), etag, last_modified)
+    return None
 
 
-def get_month_workday_stats(reference_date=None, workdays_of_week=None):
-    """Return total, passed, and remaining nominal workdays for the month of reference_date.
+def _get_worker_filter():
+    """Read the ?worker= filter as a worker id, or 'all'.
     
-    Args:
-        reference_date: Date to calculate from (defaults to today)
-        workdays_of_week: List of weekday numbers (0=Monday, 6=Sunday) or None for default Mon-Fri
+    Older links carry the worker's name instead of its id; those are resolved once here.
     """
-    if reference_date is None:
-        reference_date = date.today()
-    month_start = date(reference_date.year, reference_date.month, 1)
-    last_day = monthrange(reference_date.year, reference_date.month)[1]
-    month_end = date(reference_date.year, reference_date.month, last_day)
-    total_workdays = _count_workdays(month_start, month_end, workdays_of_week)
-    remaining_workdays = _count_workdays(reference_date, month_end, workdays_of_week)
-    workdays_passed = max(total_workdays - remaining_workdays, 0)
-    return {
-        'total': total_workdays,
-        'passed': workdays_passed,
-        'remaining': remaining_workdays
-    }
+    value = request.args.get('worker', 'all')
+    if value == 'all':
+        return 'all'
+    if value.isdigit():
+        return int(value)
+    worker = Worker.query.filter_by(name=value, user_id=current_user.id).first()
+    return worker.id if worker else 'all'
+
+
+@login_manager.user_loader
+def load_user(user_id):
+    """Load user for Flask-Login (a cached identity, see identity.py)"""
+    return load_identity(int(user_id))
 
 
 def init_db():
-    """Initialize database, run migrations, and create default user if needed"""
+    """Initialize database, upgrade its schema if needed, and create default user if needed"""
     with app.app_context():
-        # Run migrations to ensure database schema is up to date
-        try:
-            from flask_migrate import upgrade
-            upgrade()
-            print("Database migrations completed successfully.")
-        except Exception as e:
-            print(f"Migration note: {e}")
-            # If migrations haven't been initialized yet, create tables
-            # This happens on first run before migrations are set up
-            try:
-                db.create_all()
-                print("Database tables created (first run).")
-            except Exception as create_error:
-                print(f"Error creating tables: {create_error}")
+        # One PRAGMA read when the schema is current; migrations only run on older databases
+        ensure_schema()
         
         # Create default user if no users exist
-        if User.query.count() == 0:
+        if User.query.first() is None:
             default_user = User(username='ellis')
             default_user.set_password('changeme')  # Change this in production!
             db.session.add(default_user)
+            db.session.flush()  # Assigns default_user.id for the settings row below
             
             # Create default settings
             default_settings = Settings(
@@ -145,6 +186,74 @@ def init_db():
             print("Default user created: username='ellis', password='changeme'")
 
 
+@app.cli.command('rebuild-daily-totals')
+def rebuild_daily_totals_command():
+    """Recompute the daily_totals rollup from entries"""
+    rows = rollup.rebuild()
+    print(f"Daily totals rebuilt ({rows} rows).")
+
+
+@app.cli.command('backfill-status')
+def backfill_status_command():
+    """List data backfills with their checkpoint"""
+    checkpoints = backfill_status()
+    if not checkpoints:
+        print("No backfills have been started.")
+    for checkpoint in checkpoints:
+        if checkpoint['completed_at']:
+            state = f"completed {checkpoint['completed_at']:%Y-%m-%d %H:%M}"
+        elif checkpoint['last_id'] == 0:
+            state = "pending (flask --app app run-backfills)"
+        else:
+            state = f"in progress, last update {checkpoint['updated_at']:%Y-%m-%d %H:%M}"
+        print(f"{checkpoint['name']} ({checkpoint['table_name']}): {state}, at id {checkpoint['last_id']}, "
+              f"{checkpoint['rows_processed']} rows processed, {checkpoint['rows_changed']} changed")
+
+
+@app.cli.command('run-backfills')
+@click.option('--batch-size', default=BACKFILL_BATCH_SIZE, show_default=True, help='Rows per batch (and transaction)')
+def run_backfills_command(batch_size):
+    """Run (or resume) pending data backfills; the app keeps serving meanwhile"""
+    from migrations.add_entry_worker_id import worker_id_backfill_pending, backfill_entry_worker_id
+    if not worker_id_backfill_pending():
+        print("No pending backfills.")
+        return
+    report = backfill_entry_worker_id(batch_size=batch_size)
+    if not report.completed:
+        raise click.ClickException('Backfill stopped before the end; run this command again to resume.')
+
+
+@app.cli.command('sqlite-pragmas')
+def sqlite_pragmas_command():
+    """Show the configured SQLite PRAGMA profile next to what a pooled connection reports"""
+    configured = app.config.get('SQLITE_PRAGMAS') or {}
+    with db.engine.connect() as connection:
+        actual = current_pragmas(connection, configured)
+    # Enumerated PRAGMAs read back as numbers (synchronous NORMAL = 1, temp_store MEMORY = 2)
+    for name, value in configured.items():
+        print(f"{name}: {actual[name]} (configured {value})")
+
+
+@app.cli.command('import-entries')
+@click.argument('csv_path', type=click.Path(exists=True, dir_okay=False))
+@click.option('--username', required=True, help='User the entries belong to')
+@click.option('--batch-size', default=1000, show_default=True, help='Rows committed per transaction')
+def import_entries_command(csv_path, username, batch_size):
+    """Import entries for a user from a CSV file"""
+    user = User.query.filter_by(username=username).first()
+    if not user:
+        raise click.ClickException(f'User "{username}" not found.')
+    started = datetime.now()
+    with open(csv_path, newline='', encoding='utf-8-sig') as csv_file:
+        report = import_entries_csv(csv_file, user.id, batch_size=batch_size)
+    elapsed = (datetime.now() - started).total_seconds()
+    for line, message in report.errors:
+        print(f"Line {line}: {message}")
+    if report.workers_created:
+        print(f"Workers created: {', '.join(report.workers_created)}")
+    print(f"Imported {report.imported} entries, skipped {report.skipped} rows in {elapsed:.1f}s.")
+
+
 @app.route('/')
 def index():
     """Redirect to login or dashboard"""
@@ -192,78 +301,32 @@ def logout():
 @login_required
 def dashboard():
     """Main dashboard with analytics"""
-    # Get user settings
-    try:
-        settings = Settings.query.filter_by(user_id=current_user.id).first()
-    except OperationalError as e:
-        # Handle missing column error (workdays_of_week not yet migrated)
-        if 'workdays_of_week' in str(e):
-            # Try to run migration automatically
-            try:
-                from migrations.add_workdays_of_week import add_workdays_of_week
-                if add_workdays_of_week():
-                    # Retry query after migration
-                    settings = Settings.query.filter_by(user_id=current_user.id).first()
-                else:
-                    # Migration failed, use raw query without the column
-                    settings = None
-            except Exception:
-                # Migration script not available or failed, use raw query
-                settings = None
-        else:
-            raise
-    
-    if not settings:
-        settings = Settings(
-            user_id=current_user.id,
-            tax_percent=0.0,
-            reinvest_percent=0.0,
-            take_home_percent=100.0,
-            currency_symbol='$',
-            daily_revenue_goal=0.0,
-            monthly_revenue_goal=0.0,
-            monthly_take_home_goal=0.0,
-            profit_quota=0.0,
-            loss_quota=0.0,
-            workdays_of_week='0,1,2,3,4'
-        )
-        db.session.add(settings)
-        db.session.commit()
-    else:
-        # Ensure goal fields exist (for existing databases before migration)
-        if not hasattr(settings, 'daily_revenue_goal'):
-            settings.daily_revenue_goal = 0.0
-        if not hasattr(settings, 'monthly_revenue_goal'):
-            settings.monthly_revenue_goal = 0.0
-        if not hasattr(settings, 'profit_quota'):
-            settings.profit_quota = 0.0
-        if not hasattr(settings, 'loss_quota'):
-            settings.loss_quota = 0.0
-        # Check if values are None and set defaults
-        if settings.daily_revenue_goal is None:
-            settings.daily_revenue_goal = 0.0
-        if settings.monthly_revenue_goal is None:
-            settings.monthly_revenue_goal = 0.0
-        if settings.monthly_take_home_goal is None:
-            settings.monthly_take_home_goal = 0.0
-        if not hasattr(settings, 'target_days_per_month') or settings.target_days_per_month is None:
-            settings.target_days_per_month = 0
-        if settings.profit_quota is None:
-            settings.profit_quota = 0.0
-        if settings.loss_quota is None:
-            settings.loss_quota = 0.0
-        if not hasattr(settings, 'workdays_of_week') or not settings.workdays_of_week:
-            settings.workdays_of_week = '0,1,2,3,4'
+    # Get user settings (read-only snapshot, loaded once per request)
+    settings = get_settings(current_user.id)
     
     # Get worker filter
-    worker_filter = request.args.get('worker', 'all')
+    worker_filter = _get_worker_filter()
     
     # Get recent period selection (save in session for persistence)
     recent_period = request.args.get('recent_period', session.get('recent_period', '7days'))
     session['recent_period'] = recent_period  # Save to session
     
-    # Calculate date range based on selected period
+    # Nothing changed since the browser's copy: skip computing and rendering entirely
     today = date.today()
+    etag, last_modified = _data_validators('dashboard', worker_filter, recent_period, settings.updated_at)
+    not_modified = _not_modified(etag, last_modified)
+    if not_modified:
+        return not_modified
+    
+    # Computed metrics are cached per data version (the ETag), so a worker process
+    # that missed another process's write can never serve its stale copy
+    cache_key = (current_user.id, 'dashboard', etag)
+    cached = _cached_result(cache_key)
+    if cached is not None:
+        return _with_validators(make_response(render_template('dashboard.html', settings=settings, **cached)),
+                                etag, last_modified)
+    
+    # Calculate date range based on selected period
     if recent_period == '7days':
         start_date = today - timedelta(days=6)  # Last 7 days including today
         period_label = 'Last 7 Days'
@@ -282,42 +345,25 @@ def dashboard():
         start_date = today - timedelta(days=6)
         period_label = 'Last 7 Days'
     
-    # Calculate recent average take-home based on period
-    recent_entries_query = Entry.query.filter(
-        Entry.user_id == current_user.id,
-        Entry.date >= start_date,
-        Entry.date <= today
-    )
-    if worker_filter != 'all':
-        recent_entries_query = recent_entries_query.filter(Entry.worker_name == worker_filter)
-    
-    recent_entries = recent_entries_query.order_by(Entry.date.desc(), Entry.id.desc()).all()
+    # All raw figures come from a few grouped queries
+    summary = get_dashboard_summary(current_user.id, worker_filter, start_date, today)
     
     # Calculate average take-home per day (not per entry)
-    recent_total_revenue = sum(entry.revenue for entry in recent_entries)
-    recent_total_hours = sum(entry.hours for entry in recent_entries)
+    recent_total_revenue = summary['recent_revenue']
+    recent_total_hours = summary['recent_hours']
     recent_total_take_home = recent_total_revenue * (settings.take_home_percent / 100)
     
     # Count unique days worked in the period
-    unique_days = len(set(entry.date for entry in recent_entries))
+    unique_days = summary['recent_days_worked']
     recent_avg_take_home = recent_total_take_home / unique_days if unique_days > 0 else 0.0
     
     # Calculate average hourly rate based on recent period
     avg_hourly_rate = recent_total_revenue / recent_total_hours if recent_total_hours > 0 else 0.0
     
     # Calculate totals
-    total_revenue_query = db.session.query(func.sum(Entry.revenue)).filter_by(user_id=current_user.id)
-    total_hours_query = db.session.query(func.sum(Entry.hours)).filter_by(user_id=current_user.id)
-    entry_count_query = Entry.query.filter_by(user_id=current_user.id)
-    
-    if worker_filter != 'all':
-        total_revenue_query = total_revenue_query.filter(Entry.worker_name == worker_filter)
-        total_hours_query = total_hours_query.filter(Entry.worker_name == worker_filter)
-        entry_count_query = entry_count_query.filter(Entry.worker_name == worker_filter)
-    
-    total_revenue = total_revenue_query.scalar() or 0.0
-    total_hours = total_hours_query.scalar() or 0.0
-    entry_count = entry_count_query.count()
+    total_revenue = summary['total_revenue']
+    total_hours = summary['total_hours']
+    entry_count = summary['entry_count']
     
     # Calculate averages
     avg_daily_revenue = total_revenue / entry_count if entry_count > 0 else 0.0
@@ -333,68 +379,15 @@ def dashboard():
     # Note: avg_hourly_rate is now calculated above based on recent period
     
     # Advanced analytics
-    best_day = None
-    best_day_revenue = 0.0
-    best_day_hours = 0.0
-    
-    # Get worker breakdown
-    worker_stats = {}
-    worker_entries = Entry.query.filter_by(user_id=current_user.id).all()
-    if worker_filter != 'all':
-        worker_entries = [e for e in worker_entries if e.worker_name == worker_filter]
-    
-    for entry in worker_entries:
-        worker_name = entry.worker_name or 'Unassigned'
-        if worker_name not in worker_stats:
-            worker_stats[worker_name] = {'revenue': 0.0, 'hours': 0.0, 'count': 0}
-        worker_stats[worker_name]['revenue'] += entry.revenue
-        worker_stats[worker_name]['hours'] += entry.hours
-        worker_stats[worker_name]['count'] += 1
-        
-        # Track best day
-        if entry.revenue > best_day_revenue:
-            best_day_revenue = entry.revenue
-            best_day_hours = entry.hours
-            best_day = entry.date
+    best_day = summary['best_day']
+    best_day_revenue = summary['best_day_revenue']
+    best_day_hours = summary['best_day_hours']
+    worker_stats = summary['worker_stats']
     
     # Calculate trends (compare last 30 days vs previous 30 days)
     if entry_count > 0:
-        end_date = date.today()
-        recent_start = end_date - timedelta(days=29)
-        previous_start = recent_start - timedelta(days=30)
-        
-        recent_query = Entry.query.filter(
-            Entry.user_id == current_user.id,
-            Entry.date >= recent_start,
-            Entry.date <= end_date
-        )
-        previous_query = Entry.query.filter(
-            Entry.user_id == current_user.id,
-            Entry.date >= previous_start,
-            Entry.date < recent_start
-        )
-        
-        if worker_filter != 'all':
-            recent_query = recent_query.filter(Entry.worker_name == worker_filter)
-            previous_query = previous_query.filter(Entry.worker_name == worker_filter)
-        
-        recent_revenue = db.session.query(func.sum(Entry.revenue)).filter(
-            Entry.user_id == current_user.id,
-            Entry.date >= recent_start,
-            Entry.date <= end_date
-        )
-        previous_revenue = db.session.query(func.sum(Entry.revenue)).filter(
-            Entry.user_id == current_user.id,
-            Entry.date >= previous_start,
-            Entry.date < recent_start
-        )
-        
-        if worker_filter != 'all':
-            recent_revenue = recent_revenue.filter(Entry.worker_name == worker_filter)
-            previous_revenue = previous_revenue.filter(Entry.worker_name == worker_filter)
-        
-        recent_rev = recent_revenue.scalar() or 0.0
-        previous_rev = previous_revenue.scalar() or 0.0
+        recent_rev = summary['trend_revenue']
+        previous_rev = summary['previous_trend_revenue']
         
         revenue_change = recent_rev - previous_rev
         revenue_change_percent = (revenue_change / previous_rev * 100) if previous_rev > 0 else 0.0
@@ -405,27 +398,8 @@ def dashboard():
         revenue_change_percent_abs = 0.0
     
     # Calculate goal progress
-    today = date.today()
-    month_start = date(today.year, today.month, 1)
-    
-    # Daily revenue (today)
-    daily_revenue_query = db.session.query(func.sum(Entry.revenue)).filter(
-        Entry.user_id == current_user.id,
-        Entry.date == today
-    )
-    if worker_filter != 'all':
-        daily_revenue_query = daily_revenue_query.filter(Entry.worker_name == worker_filter)
-    daily_revenue = daily_revenue_query.scalar() or 0.0
-    
-    # Monthly revenue (current month)
-    monthly_revenue_query = db.session.query(func.sum(Entry.revenue)).filter(
-        Entry.user_id == current_user.id,
-        Entry.date >= month_start,
-        Entry.date <= today
-    )
-    if worker_filter != 'all':
-        monthly_revenue_query = monthly_revenue_query.filter(Entry.worker_name == worker_filter)
-    monthly_revenue = monthly_revenue_query.scalar() or 0.0
+    daily_revenue = summary['daily_revenue']
+    monthly_revenue = summary['monthly_revenue']
     
     # Calculate monthly take-home amount (current month)
     monthly_take_home_amount = monthly_revenue * (settings.take_home_percent / 100)
@@ -440,60 +414,36 @@ def dashboard():
     annual_reinvest_forecast = monthly_reinvest * 12
     annual_take_home_forecast = monthly_take_home_for_forecast * 12
     
-    # Goal progress calculations (with safe attribute access)
-    daily_revenue_goal = getattr(settings, 'daily_revenue_goal', 0.0)
-    if daily_revenue_goal is None:
-        daily_revenue_goal = 0.0
-    
-    monthly_revenue_goal = getattr(settings, 'monthly_revenue_goal', 0.0)
-    if monthly_revenue_goal is None:
-        monthly_revenue_goal = 0.0
-    
-    profit_quota = getattr(settings, 'profit_quota', 0.0)
-    if profit_quota is None:
-        profit_quota = 0.0
-    
-    loss_quota = getattr(settings, 'loss_quota', 0.0)
-    if loss_quota is None:
-        loss_quota = 0.0
-    
-    monthly_take_home_goal = getattr(settings, 'monthly_take_home_goal', 0.0)
-    if monthly_take_home_goal is None:
-        monthly_take_home_goal = 0.0
+    # Goal progress calculations (UserSettings fills in defaults for unset goals)
+    daily_revenue_goal = settings.daily_revenue_goal
+    monthly_revenue_goal = settings.monthly_revenue_goal
+    profit_quota = settings.profit_quota
+    loss_quota = settings.loss_quota
+    monthly_take_home_goal = settings.monthly_take_home_goal
     
     daily_goal_progress = (daily_revenue / daily_revenue_goal * 100) if daily_revenue_goal > 0 else 0.0
     monthly_goal_progress = (monthly_revenue / monthly_revenue_goal * 100) if monthly_revenue_goal > 0 else 0.0
     monthly_take_home_goal_progress = (monthly_take_home_amount / monthly_take_home_goal * 100) if monthly_take_home_goal > 0 else 0.0
     
-    # Calculate days worked this month (needed for both goal and target days calculations)
-    days_worked_this_month_query = db.session.query(func.count(func.distinct(Entry.date))).filter(
-        Entry.user_id == current_user.id,
-        Entry.date >= month_start,
-        Entry.date <= today
-    )
-    if worker_filter != 'all':
-        days_worked_this_month_query = days_worked_this_month_query.filter(Entry.worker_name == worker_filter)
-    days_worked_this_month = days_worked_this_month_query.scalar() or 0
+    # Days worked this month (needed for both goal and target days calculations)
+    days_worked_this_month = summary['days_worked_this_month']
     
     # Calculate days remaining in month
     last_day_of_month = monthrange(today.year, today.month)[1]
     days_remaining_in_month = last_day_of_month - today.day
 
-    # Parse workdays_of_week from settings
-    workdays_of_week = None
-    if settings:
-        try:
-            if hasattr(settings, 'workdays_of_week') and settings.workdays_of_week:
-                try:
-                    workdays_of_week = [int(d.strip()) for d in settings.workdays_of_week.split(',') if d.strip()]
-                except (ValueError, AttributeError):
-                    workdays_of_week = None
-        except (AttributeError, OperationalError):
-            # Column doesn't exist yet, use default (None = Mon-Fri)
-            workdays_of_week = None
+    # Workdays of week come pre-parsed with the settings
+    workdays_of_week = settings.workdays
+    
+    # Holidays/closures falling in the current month
+    holidays = [h.date for h in Holiday.query.filter(
+        Holiday.user_id == current_user.id,
+        Holiday.date >= date(today.year, today.month, 1),
+        Holiday.date <= date(today.year, today.month, last_day_of_month)
+    ).order_by(Holiday.date).all()]
     
     # Nominal workday statistics for the current month
-    workday_stats = get_month_workday_stats(today, workdays_of_week)
+    workday_stats = get_month_workday_stats(today, workdays_of_week, holidays)
     nominal_workdays_total = workday_stats['total']
     nominal_workdays_passed = workday_stats['passed']
     nominal_workdays_remaining = workday_stats['remaining']
@@ -524,9 +474,7 @@ def dashboard():
     
     # Calculate target days status
     target_days_status = None
-    target_days_per_month = getattr(settings, 'target_days_per_month', 0)
-    if target_days_per_month is None:
-        target_days_per_month = 0
+    target_days_per_month = settings.target_days_per_month
     
     if target_days_per_month > 0:
         # Determine status by comparing days needed for goal vs days remaining
@@ -574,164 +522,99 @@ def dashboard():
     if monthly_take_home_goal > 0 and nominal_workdays_remaining > 0:
         required_daily_take_home_target = remaining_take_home_to_goal / nominal_workdays_remaining
     
-    # Get workers for filter dropdown
-    workers = Worker.query.filter_by(user_id=current_user.id).order_by(Worker.name).all()
+    # Get workers for filter dropdown (plain dicts so the result can be cached)
+    workers = [{'id': w.id, 'name': w.name}
+               for w in Worker.query.filter_by(user_id=current_user.id).order_by(Worker.name).all()]
+    
+    context = dict(
+        total_revenue=total_revenue,
+        total_hours=total_hours,
+        entry_count=entry_count,
+        avg_daily_revenue=avg_daily_revenue,
+        avg_hours_per_day=avg_hours_per_day,
+        avg_daily_take_home=avg_daily_take_home,
+        avg_hourly_rate=avg_hourly_rate,
+        tax_amount=tax_amount,
+        reinvest_amount=reinvest_amount,
+        take_home_amount=take_home_amount,
+        workers=workers,
+        selected_worker=worker_filter,
+        selected_worker_name=next((w['name'] for w in workers if w['id'] == worker_filter), None),
+        best_day=best_day,
+        best_day_revenue=best_day_revenue,
+        best_day_hours=best_day_hours,
+        worker_stats=worker_stats,
+        revenue_change=revenue_change,
+        revenue_change_percent=revenue_change_percent,
+        revenue_change_percent_abs=revenue_change_percent_abs,
+        daily_revenue=daily_revenue,
+        monthly_revenue=monthly_revenue,
+        daily_goal_progress=daily_goal_progress,
+        monthly_goal_progress=monthly_goal_progress,
+        monthly_take_home_amount=monthly_take_home_amount,
+        monthly_take_home_goal_progress=monthly_take_home_goal_progress,
+        days_needed_for_goal=days_needed_for_goal,
+        remaining_take_home_needed=remaining_take_home_needed,
+        avg_daily_take_home_this_month=avg_daily_take_home_this_month,
+        days_worked_this_month=days_worked_this_month,
+        days_remaining_in_month=days_remaining_in_month,
+        target_days_per_month=target_days_per_month,
+        target_days_status=target_days_status,
+        profit_quota_met=profit_quota_met,
+        loss_quota_exceeded=loss_quota_exceeded,
+        nominal_workdays_total=nominal_workdays_total,
+        nominal_workdays_passed=nominal_workdays_passed,
+        nominal_workdays_remaining=nominal_workdays_remaining,
+        required_daily_take_home_target=required_daily_take_home_target,
+        remaining_take_home_to_goal=remaining_take_home_to_goal,
+        recent_period=recent_period,
+        recent_avg_take_home=recent_avg_take_home,
+        annual_tax_forecast=annual_tax_forecast,
+        annual_reinvest_forecast=annual_reinvest_forecast,
+        annual_take_home_forecast=annual_take_home_forecast
+    )
+    result_cache.set(cache_key, context)
     
-    return render_template('dashboard.html',
-                         total_revenue=total_revenue,
-                         total_hours=total_hours,
-                         entry_count=entry_count,
-                         avg_daily_revenue=avg_daily_revenue,
-                         avg_hours_per_day=avg_hours_per_day,
-                         avg_daily_take_home=avg_daily_take_home,
-                         avg_hourly_rate=avg_hourly_rate,
-                         settings=settings,
-                         tax_amount=tax_amount,
-                         reinvest_amount=reinvest_amount,
-                         take_home_amount=take_home_amount,
-                         workers=workers,
-                         selected_worker=worker_filter,
-                         best_day=best_day,
-                         best_day_revenue=best_day_revenue,
-                         best_day_hours=best_day_hours,
-                         worker_stats=worker_stats,
-                         revenue_change=revenue_change,
-                         revenue_change_percent=revenue_change_percent,
-                         revenue_change_percent_abs=revenue_change_percent_abs,
-                         daily_revenue=daily_revenue,
-                         monthly_revenue=monthly_revenue,
-                         daily_goal_progress=daily_goal_progress,
-                         monthly_goal_progress=monthly_goal_progress,
-                         monthly_take_home_amount=monthly_take_home_amount,
-                         monthly_take_home_goal_progress=monthly_take_home_goal_progress,
-                         days_needed_for_goal=days_needed_for_goal,
-                         remaining_take_home_needed=remaining_take_home_needed,
-                         avg_daily_take_home_this_month=avg_daily_take_home_this_month,
-                         days_worked_this_month=days_worked_this_month,
-                         days_remaining_in_month=days_remaining_in_month,
-                         target_days_per_month=target_days_per_month,
-                         target_days_status=target_days_status,
-                         profit_quota_met=profit_quota_met,
-                         loss_quota_exceeded=loss_quota_exceeded,
-                         nominal_workdays_total=nominal_workdays_total,
-                         nominal_workdays_passed=nominal_workdays_passed,
-                         nominal_workdays_remaining=nominal_workdays_remaining,
-                         required_daily_take_home_target=required_daily_take_home_target,
-                         remaining_take_home_to_goal=remaining_take_home_to_goal,
-                         recent_period=recent_period,
-                         recent_avg_take_home=recent_avg_take_home,
-                         annual_tax_forecast=annual_tax_forecast,
-                         annual_reinvest_forecast=annual_reinvest_forecast,
-                         annual_take_home_forecast=annual_take_home_forecast)
+    return _with_validators(make_response(render_template('dashboard.html', settings=settings, **context)),
+                            etag, last_modified)
 
 
-@app.route('/api/chart_data')
-@login_required
-def chart_data():
-    """API endpoint for Chart.js data"""
-    period = request.args.get('period', 'daily')
-    worker_filter = request.args.get('worker', 'all')
+def _chart_series(period, buckets, today):
+    """Labels plus revenue and hours values for a chart period ending today"""
+    labels = []
+    revenue_values = []
+    hours_values = []
+    start_date = chart_window_start(period, today)
     
     if period == 'daily':
         # Last 30 days
-        end_date = date.today()
-        start_date = end_date - timedelta(days=29)
-        
-        query = Entry.query.filter(
-            Entry.user_id == current_user.id,
-            Entry.date >= start_date,
-            Entry.date <= end_date
-        )
-        if worker_filter != 'all':
-            query = query.filter(Entry.worker_name == worker_filter)
-        entries = query.order_by(Entry.date).all()
-        
-        # Create date range
-        date_range = []
         current = start_date
-        while current <= end_date:
-            date_range.append(current)
+        while current <= today:
+            revenue, hours = buckets.get(current.isoformat(), (0, 0))
+            labels.append(current.strftime('%m/%d'))
+            revenue_values.append(revenue)
+            hours_values.append(hours)
             current += timedelta(days=1)
         
-        # Group by date
-        revenue_data = {}
-        hours_data = {}
-        for entry in entries:
-            day_str = entry.date.isoformat()
-            revenue_data[day_str] = revenue_data.get(day_str, 0) + entry.revenue
-            hours_data[day_str] = hours_data.get(day_str, 0) + entry.hours
-        
-        labels = [d.strftime('%m/%d') for d in date_range]
-        revenue_values = [revenue_data.get(d.isoformat(), 0) for d in date_range]
-        hours_values = [hours_data.get(d.isoformat(), 0) for d in date_range]
-        
     elif period == 'weekly':
-        # Last 12 weeks
-        end_date = date.today()
-        start_date = end_date - timedelta(weeks=11)
-        
-        query = Entry.query.filter(
-            Entry.user_id == current_user.id,
-            Entry.date >= start_date,
-            Entry.date <= end_date
-        )
-        if worker_filter != 'all':
-            query = query.filter(Entry.worker_name == worker_filter)
-        entries = query.all()
-        
-        # Group by week
-        revenue_data = {}
-        hours_data = {}
-        for entry in entries:
-            # Get ISO week number
-            week_key = f"{entry.date.isocalendar()[0]}-W{entry.date.isocalendar()[1]:02d}"
-            revenue_data[week_key] = revenue_data.get(week_key, 0) + entry.revenue
-            hours_data[week_key] = hours_data.get(week_key, 0) + entry.hours
-        
-        # Generate labels for last 12 weeks
-        labels = []
-        revenue_values = []
-        hours_values = []
+        # Last 12 weeks (buckets are keyed by the week's Monday)
         current = start_date
         for _ in range(12):
-            week_key = f"{current.isocalendar()[0]}-W{current.isocalendar()[1]:02d}"
+            week_start = current - timedelta(days=current.weekday())
+            revenue, hours = buckets.get(week_start.isoformat(), (0, 0))
             labels.append(f"Week {current.isocalendar()[1]}")
-            revenue_values.append(revenue_data.get(week_key, 0))
-            hours_values.append(hours_data.get(week_key, 0))
+            revenue_values.append(revenue)
+            hours_values.append(hours)
             current += timedelta(weeks=1)
         
     else:  # monthly
         # Last 12 months
-        end_date = date.today()
-        start_date = end_date - timedelta(days=365)
-        
-        query = Entry.query.filter(
-            Entry.user_id == current_user.id,
-            Entry.date >= start_date,
-            Entry.date <= end_date
-        )
-        if worker_filter != 'all':
-            query = query.filter(Entry.worker_name == worker_filter)
-        entries = query.all()
-        
-        # Group by month
-        revenue_data = {}
-        hours_data = {}
-        for entry in entries:
-            month_key = f"{entry.date.year}-{entry.date.month:02d}"
-            revenue_data[month_key] = revenue_data.get(month_key, 0) + entry.revenue
-            hours_data[month_key] = hours_data.get(month_key, 0) + entry.hours
-        
-        # Generate labels for last 12 months
-        labels = []
-        revenue_values = []
-        hours_values = []
-        current = end_date.replace(day=1)
+        current = today.replace(day=1)
         for _ in range(12):
-            month_key = f"{current.year}-{current.month:02d}"
+            revenue, hours = buckets.get(f"{current.year}-{current.month:02d}", (0, 0))
             labels.append(current.strftime('%b %Y'))
-            revenue_values.append(revenue_data.get(month_key, 0))
-            hours_values.append(hours_data.get(month_key, 0))
+            revenue_values.append(revenue)
+            hours_values.append(hours)
             # Move to previous month
             if current.month == 1:
                 current = current.replace(year=current.year - 1, month=12)
@@ -741,85 +624,193 @@ def chart_data():
         revenue_values.reverse()
         hours_values.reverse()
     
+    return labels, revenue_values, hours_values
+
+
+def _chart_payload(period, buckets, today):
+    """Chart.js payload for one period: series plus summary figures"""
+    labels, revenue_values, hours_values = _chart_series(period, buckets, today)
+    
     # Calculate additional chart metrics
     avg_revenue_per_period = sum(revenue_values) / len([v for v in revenue_values if v > 0]) if any(v > 0 for v in revenue_values) else 0
     max_revenue = max(revenue_values) if revenue_values else 0
     min_revenue = min([v for v in revenue_values if v > 0]) if any(v > 0 for v in revenue_values) else 0
     
-    return jsonify({
+    return {
         'labels': labels,
         'revenue': revenue_values,
         'hours': hours_values,
         'avg_revenue': avg_revenue_per_period,
         'max_revenue': max_revenue,
         'min_revenue': min_revenue
-    })
+    }
+
+
+@app.route('/metrics')
+def metrics():
+    """Per-endpoint request and SQL metrics of this worker process, in Prometheus text format"""
+    if not app.config['METRICS_ENABLED']:
+        return 'Metrics are disabled.', 404
+    token = app.config.get('METRICS_TOKEN')
+    if token:
+        if not hmac.compare_digest(request.headers.get('Authorization', ''), f'Bearer {token}'):
+            return 'Unauthorized.', 401
+    elif request.remote_addr not in ('127.0.0.1', '::1'):
+        # Paths, per-user request counts and SQL timings are not for the whole network
+        return 'Set METRICS_TOKEN to scrape metrics from another host.', 403
+    return Response(render_metrics(), mimetype='text/plain; version=0.0.4')
+
+
+@app.route('/admin/profiles')
+@login_required
+def profiles():
+    """Recent request profiles (add ?_profile=1 to any page as an admin to record one)"""
+    if not is_admin(app, current_user):
+        return 'Not found.', 404
+    return render_template('profiles.html', profiles=list_profiles(app.config['PROFILE_DIR'], limit=100),
+                           profile_parameter=PROFILE_PARAMETER)
+
+
+@app.route('/admin/profiles/<profile_id>')
+@login_required
+def profile_detail(profile_id):
+    """Top functions of one profile, or one of its files with ?download=prof|collapsed"""
+    if not is_admin(app, current_user):
+        return 'Not found.', 404
+    download = request.args.get('download')
+    if download in ('prof', 'collapsed'):
+        path = profile_path(app.config['PROFILE_DIR'], profile_id, f'.{download}')
+        if path is None:
+            return 'Profile not found.', 404
+        return send_file(path, mimetype='application/octet-stream' if download == 'prof' else 'text/plain',
+                         as_attachment=True, download_name=path.name)
+    profile = get_profile(app.config['PROFILE_DIR'], profile_id)
+    if profile is None:
+        return 'Profile not found.', 404
+    return render_template('profiles.html', profile=profile,
+                           summary=profile_summary(app.config['PROFILE_DIR'], profile_id))
+
+
+@app.route('/api/chart_data')
+@login_required
+def chart_data():
+    """API endpoint for Chart.js data"""
+    period = request.args.get('period', 'daily')
+    if period not in CHART_BUCKETS:
+        period = 'monthly'
+    worker_filter = _get_worker_filter()
+    
+    etag, last_modified = _data_validators('chart', period, worker_filter)
+    not_modified = _not_modified(etag, last_modified)
+    if not_modified:
+        return not_modified
+    
+    today = date.today()
+    cache_key = (current_user.id, 'chart', etag)
+    cached = _cached_result(cache_key)
+    if cached is not None:
+        return _with_validators(jsonify(cached), etag, last_modified)
+    
+    buckets = get_chart_buckets(current_user.id, worker_filter, period, chart_window_start(period, today), today)
+    payload = _chart_payload(period, buckets, today)
+    result_cache.set(cache_key, payload)
+    return _with_validators(jsonify(payload), etag, last_modified)
+
+
+@app.route('/api/chart_series')
+@login_required
+def chart_series():
+    """Daily, weekly and monthly chart data plus per-worker series in one response.
+    
+    Computed from a single pass over the rollup, so the dashboard can switch
+    period or worker without another request.
+    """
+    worker_filter = _get_worker_filter()
+    
+    etag, last_modified = _data_validators('chart_series', worker_filter)
+    not_modified = _not_modified(etag, last_modified)
+    if not_modified:
+        return not_modified
+    
+    today = date.today()
+    cache_key = (current_user.id, 'chart_series', etag)
+    cached = _cached_result(cache_key)
+    if cached is not None:
+        return _with_validators(jsonify(cached), etag, last_modified)
+    
+    totals, per_worker = get_all_chart_buckets(current_user.id, worker_filter, today)
+    names = {w.id: w.name for w in Worker.query.filter_by(user_id=current_user.id)}
+    workers = []
+    for worker_id in sorted(per_worker, key=lambda wid: (wid is None, names.get(wid, ''))):
+        series = {}
+        for period, buckets in per_worker[worker_id].items():
+            _, revenue_values, hours_values = _chart_series(period, buckets, today)
+            series[period] = {'revenue': revenue_values, 'hours': hours_values}
+        workers.append({
+            'id': worker_id,
+            'name': names.get(worker_id, 'Unassigned'),
+            'periods': series
+        })
+    
+    payload = {
+        'periods': {period: _chart_payload(period, buckets, today) for period, buckets in totals.items()},
+        'workers': workers
+    }
+    result_cache.set(cache_key, payload)
+    return _with_validators(jsonify(payload), etag, last_modified)
 
 
 @app.route('/entries')
 @login_required
 def entries():
     """View all entries with pagination"""
-    # Get settings
-    settings = Settings.query.filter_by(user_id=current_user.id).first()
-    if not settings:
-        settings = Settings(
-            user_id=current_user.id,
-            tax_percent=0.0,
-            reinvest_percent=0.0,
-            take_home_percent=100.0,
-            currency_symbol='$',
-            daily_revenue_goal=0.0,
-            monthly_revenue_goal=0.0,
-            monthly_take_home_goal=0.0,
-            target_days_per_month=0,
-            profit_quota=0.0,
-            loss_quota=0.0,
-            workdays_of_week='0,1,2,3,4'
-        )
-        db.session.add(settings)
-        db.session.commit()
+    settings = get_settings(current_user.id)
     
     # Get worker filter
-    worker_filter = request.args.get('worker', 'all')
+    worker_filter = _get_worker_filter()
     
-    # Pagination parameters
-    page = request.args.get('page', 1, type=int)
+    # Pagination parameters (opaque keyset cursors, see pagination.py)
+    after = request.args.get('after')
+    before = request.args.get('before')
     per_page = request.args.get('per_page', 20, type=int)
     per_page = min(max(per_page, 5), 100)  # Limit between 5 and 100
     
     # Build query
     query = Entry.query.filter_by(user_id=current_user.id)
     if worker_filter != 'all':
-        query = query.filter(Entry.worker_name == worker_filter)
+        query = query.filter(Entry.worker_id == worker_filter)
     
-    # Get paginated entries
-    entries = query.order_by(Entry.date.desc()).paginate(
-        page=page,
-        per_page=per_page,
-        error_out=False
-    )
+    # Get one page of entries, newest first, with worker names joined in
+    query = query.options(joinedload(Entry.worker))
+    entries = keyset_paginate(query, Entry, per_page, after=after, before=before)
+    
+    # Total count comes from the daily rollup and is cached per data version
+    version, _ = get_data_version(current_user.id)
+    count_key = (current_user.id, 'entry_count', worker_filter, version)
+    total_entries = _cached_result(count_key)
+    if total_entries is None:
+        total_entries = count_entries(current_user.id, worker_filter)
+        result_cache.set(count_key, total_entries)
     
     # Get all workers for filter dropdown
     workers = Worker.query.filter_by(user_id=current_user.id).order_by(Worker.name).all()
-    worker_names = [w.name for w in workers]
-    
-    # Get worker stats for filter dropdown
-    worker_stats = []
-    if workers:
-        for worker in workers:
-            worker_entries = Entry.query.filter_by(
-                user_id=current_user.id,
-                worker_name=worker.name
-            ).count()
-            if worker_entries > 0:
-                worker_stats.append({
-                    'name': worker.name,
-                    'count': worker_entries
-                })
+    
+    # Get worker stats for filter dropdown (registered workers with entries only)
+    stats_key = (current_user.id, 'worker_stats', version)
+    all_worker_stats = _cached_result(stats_key)
+    if all_worker_stats is None:
+        all_worker_stats = get_worker_stats(current_user.id)
+        result_cache.set(stats_key, all_worker_stats)
+    stats_by_id = {stats['worker_id']: stats for stats in all_worker_stats.values()}
+    worker_stats = [
+        dict(stats_by_id[w.id], id=w.id, name=w.name)
+        for w in workers
+        if w.id in stats_by_id
+    ]
     
     return render_template('entries.html',
                          entries=entries,
+                         total_entries=total_entries,
                          settings=settings,
                          workers=workers,
                          worker_stats=worker_stats,
@@ -840,48 +831,13 @@ def add_entry():
         if not entry:
             flash('Entry not found.', 'error')
             return redirect(url_for('entries'))
-        # Find worker ID for existing entry
-        if entry.worker_name:
-            worker = Worker.query.filter_by(name=entry.worker_name, user_id=current_user.id).first()
-            if worker:
-                selected_worker_id = worker.id
+        selected_worker_id = entry.worker_id
     
     # Get workers for dropdown
     workers = Worker.query.filter_by(user_id=current_user.id).order_by(Worker.name).all()
     
     # Get default worker from settings
-    settings = Settings.query.filter_by(user_id=current_user.id).first()
-    if not settings:
-        settings = Settings(
-            user_id=current_user.id,
-            tax_percent=0.0,
-            reinvest_percent=0.0,
-            take_home_percent=100.0,
-            currency_symbol='$',
-            daily_revenue_goal=0.0,
-            monthly_revenue_goal=0.0,
-            monthly_take_home_goal=0.0,
-            target_days_per_month=0,
-            profit_quota=0.0,
-            loss_quota=0.0,
-            workdays_of_week='0,1,2,3,4'
-        )
-        db.session.add(settings)
-        db.session.commit()
-    else:
-        # Ensure goal fields exist (for existing databases before migration)
-        if not hasattr(settings, 'daily_revenue_goal') or settings.daily_revenue_goal is None:
-            settings.daily_revenue_goal = 0.0
-        if not hasattr(settings, 'monthly_revenue_goal') or settings.monthly_revenue_goal is None:
-            settings.monthly_revenue_goal = 0.0
-        if not hasattr(settings, 'monthly_take_home_goal') or settings.monthly_take_home_goal is None:
-            settings.monthly_take_home_goal = 0.0
-        if not hasattr(settings, 'target_days_per_month') or settings.target_days_per_month is None:
-            settings.target_days_per_month = 0
-        if not hasattr(settings, 'profit_quota') or settings.profit_quota is None:
-            settings.profit_quota = 0.0
-        if not hasattr(settings, 'loss_quota') or settings.loss_quota is None:
-            settings.loss_quota = 0.0
+    settings = get_settings(current_user.id)
     
     default_worker_id = None
     if settings and settings.default_worker_id:
@@ -901,29 +857,32 @@ def add_entry():
             worker_id = request.form.get('worker_id', '').strip()
             notes = request.form.get('notes', '').strip()
             
-            # Get worker name from ID
-            worker_name = None
+            # Only accept the user's own workers
+            worker = None
             if worker_id:
                 worker = Worker.query.filter_by(id=worker_id, user_id=current_user.id).first()
-                if worker:
-                    worker_name = worker.name
-            
-            if hours <= 0:
-                flash('Hours must be greater than 0.', 'error')
-                return render_template('add_entry.html', entry=entry, workers=workers, default_worker_id=selected_worker_id, settings=settings)
             
-            if revenue < 0:
-                flash('Revenue cannot be negative.', 'error')
+            error = validate_entry_values(hours, revenue)
+            if error:
+                flash(error, 'error')
                 return render_template('add_entry.html', entry=entry, workers=workers, default_worker_id=selected_worker_id, settings=settings)
             
             if entry:
-                # Update existing entry
+                # Update existing entry, moving its amounts in the daily rollup
+                entry = rollup.lock_entries(current_user.id, [entry.id]).get(entry.id)
+                if not entry:
+                    db.session.rollback()
+                    flash('Entry not found.', 'error')
+                    return redirect(url_for('entries'))
+                rollup.remove_entry(entry)
                 entry.date = entry_date
                 entry.hours = hours
                 entry.revenue = revenue
-                entry.worker_name = worker_name
+                entry.worker_id = worker.id if worker else None
+                entry.worker_name = None  # Legacy name; the worker_id backfill must not relink it
                 entry.notes = notes
                 entry.updated_at = datetime.utcnow()
+                rollup.add_entry(entry)
                 flash('Entry updated successfully.', 'success')
             else:
                 # Create new entry
@@ -931,14 +890,16 @@ def add_entry():
                     date=entry_date,
                     hours=hours,
                     revenue=revenue,
-                    worker_name=worker_name,
+                    worker_id=worker.id if worker else None,
                     notes=notes,
                     user_id=current_user.id
                 )
                 db.session.add(entry)
+                rollup.add_entry(entry)
                 flash('Entry added successfully.', 'success')
             
             db.session.commit()
+            invalidate_user_cache(current_user.id)
             return redirect(url_for('entries'))
             
         except ValueError as e:
@@ -952,16 +913,126 @@ def add_entry():
     return render_template('add_entry.html', entry=entry, workers=workers, default_worker_id=selected_worker_id, settings=settings)
 
 
+def _replay_idempotent_response(stored):
+    """Return a previously stored batch response"""
+    response = app.response_class(stored.response_body, status=stored.status_code, mimetype='application/json')
+    response.headers['Idempotent-Replayed'] = 'true'
+    return response
+
+
+@app.route('/api/entries/batch', methods=['POST'])
+@login_required
+def entries_batch():
+    """Create, update and delete many entries in one transaction (see entry_batch.py)"""
+    key = request.headers.get('Idempotency-Key', '').strip() or None
+    if key and len(key) > MAX_IDEMPOTENCY_KEY_LENGTH:
+        return jsonify({'error': f'Idempotency-Key is longer than {MAX_IDEMPOTENCY_KEY_LENGTH} characters.'}), 400
+    raw_hash = request_hash(request.get_data())
+    
+    # A retry of a batch that already went through gets the original response back
+    if key:
+        stored = find_idempotent_response(current_user.id, key, app.config['IDEMPOTENCY_KEY_TTL_HOURS'])
+        if stored:
+            if stored.request_hash != raw_hash:
+                return jsonify({'error': 'Idempotency-Key was already used for a different request.'}), 422
+            return _replay_idempotent_response(stored)
+    
+    payload = request.get_json(silent=True)
+    if not isinstance(payload, dict):
+        return jsonify({'error': 'Request body must be a JSON object.'}), 400
+    
+    try:
+        results = apply_entry_batch(current_user.id, payload.get('operations'))
+    except BatchError as e:
+        db.session.rollback()
+        return jsonify({'errors': e.errors}), 400
+    
+    body = {'results': results}
+    if key:
+        store_idempotent_response(current_user.id, key, raw_hash, 200, body,
+                                  app.config['IDEMPOTENCY_KEY_TTL_HOURS'])
+    try:
+        db.session.commit()
+    except IntegrityError:
+        # A concurrent retry with the same key committed first; nothing of ours was written
+        db.session.rollback()
+        stored = (find_idempotent_response(current_user.id, key, app.config['IDEMPOTENCY_KEY_TTL_HOURS'])
+                  if key else None)
+        if stored is None:
+            raise
+        return _replay_idempotent_response(stored)
+    invalidate_user_cache(current_user.id)
+    return jsonify(body)
+
+
+@app.route('/import_entries', methods=['GET', 'POST'])
+@login_required
+def import_entries():
+    """Bulk import entries from an uploaded CSV file"""
+    report = None
+    if request.method == 'POST':
+        upload = request.files.get('file')
+        if not upload or not upload.filename:
+            flash('Please choose a CSV file to import.', 'error')
+        else:
+            # Parse straight from the upload stream instead of reading the file into memory
+            text_stream = io.TextIOWrapper(upload.stream, encoding='utf-8-sig', newline='')
+            try:
+                report = import_entries_csv(text_stream, current_user.id)
+            except UnicodeDecodeError:
+                db.session.rollback()
+                flash('The file is not valid UTF-8 text.', 'error')
+            except Exception as e:
+                db.session.rollback()
+                flash(f'Import stopped: {str(e)}', 'error')
+                import traceback
+                print(f"Error importing entries: {traceback.format_exc()}")
+            finally:
+                invalidate_user_cache(current_user.id)
+            if report:
+                flash(f'Imported {report.imported} entries ({report.skipped} rows skipped).',
+                      'success' if report.imported else 'error')
+    return render_template('import_entries.html', report=report)
+
+
+@app.route('/export_entries')
+@login_required
+def export_entries():
+    """Stream the user's entries as a CSV or NDJSON download"""
+    fmt = request.args.get('format', 'csv')
+    if fmt not in EXPORT_FORMATS:
+        return jsonify({'error': f'Unknown format "{fmt}" (use csv or ndjson).'}), 400
+    try:
+        start_date = datetime.strptime(request.args['start'], '%Y-%m-%d').date() if request.args.get('start') else None
+        end_date = datetime.strptime(request.args['end'], '%Y-%m-%d').date() if request.args.get('end') else None
+    except ValueError:
+        return jsonify({'error': 'Dates must be in YYYY-MM-DD format.'}), 400
+    worker_filter = _get_worker_filter()
+    
+    # Rows are read from the database batch by batch while the response is being sent
+    rows = iter_export_rows(current_user.id, worker_filter, start_date, end_date)
+    filename = f"entries-{start_date or 'all'}-{end_date or date.today()}.{fmt}"
+    return Response(
+        stream_with_context(serialize_entries(rows, fmt)),
+        mimetype=EXPORT_FORMATS[fmt],
+        headers={'Content-Disposition': f'attachment; filename="{filename}"'}
+    )
+
+
 @app.route('/delete_entry/<int:entry_id>')
 @login_required
 def delete_entry(entry_id):
     """Delete work entry"""
-    entry = Entry.query.filter_by(id=entry_id, user_id=current_user.id).first()
+    # Loaded under the write lock: a second click on the link finds nothing to subtract
+    entry = rollup.lock_entries(current_user.id, [entry_id]).get(entry_id)
     if entry:
+        rollup.remove_entry(entry)
         db.session.delete(entry)
         db.session.commit()
+        invalidate_user_cache(current_user.id)
         flash('Entry deleted successfully.', 'success')
     else:
+        db.session.rollback()
         flash('Entry not found.', 'error')
     # Redirect back to the page that called this (entries or dashboard)
     referrer = request.referrer
@@ -974,43 +1045,24 @@ def delete_entry(entry_id):
 @login_required
 def settings():
     """Configure percentage settings and workers"""
-    settings_obj = Settings.query.filter_by(user_id=current_user.id).first()
-    
-    if not settings_obj:
-        settings_obj = Settings(
-            user_id=current_user.id,
-            tax_percent=0.0,
-            reinvest_percent=0.0,
-            take_home_percent=100.0,
-            currency_symbol='$',
-            daily_revenue_goal=0.0,
-            monthly_revenue_goal=0.0,
-            monthly_take_home_goal=0.0,
-            profit_quota=0.0,
-            loss_quota=0.0
-        )
-        db.session.add(settings_obj)
-        db.session.commit()
+    if request.method == 'POST':
+        # Edit the row itself, and drop cached snapshots once the handler below has committed
+        settings_obj = get_settings_row(current_user.id)
+        user_id = current_user.id
+        
+        @after_this_request
+        def drop_cached_settings(response):
+            invalidate_settings(user_id)
+            return response
     else:
-        # Ensure goal fields exist (for existing databases before migration)
-        if not hasattr(settings_obj, 'daily_revenue_goal') or settings_obj.daily_revenue_goal is None:
-            settings_obj.daily_revenue_goal = 0.0
-        if not hasattr(settings_obj, 'monthly_revenue_goal') or settings_obj.monthly_revenue_goal is None:
-            settings_obj.monthly_revenue_goal = 0.0
-        if not hasattr(settings_obj, 'monthly_take_home_goal') or settings_obj.monthly_take_home_goal is None:
-            settings_obj.monthly_take_home_goal = 0.0
-        if not hasattr(settings_obj, 'target_days_per_month') or settings_obj.target_days_per_month is None:
-            settings_obj.target_days_per_month = 0
-        if not hasattr(settings_obj, 'profit_quota') or settings_obj.profit_quota is None:
-            settings_obj.profit_quota = 0.0
-        if not hasattr(settings_obj, 'loss_quota') or settings_obj.loss_quota is None:
-            settings_obj.loss_quota = 0.0
-        if not hasattr(settings_obj, 'workdays_of_week') or not settings_obj.workdays_of_week:
-            settings_obj.workdays_of_week = '0,1,2,3,4'
+        settings_obj = get_settings(current_user.id)
     
     # Get workers
     workers = Worker.query.filter_by(user_id=current_user.id).order_by(Worker.name).all()
     
+    # Get holidays/closures
+    holidays = Holiday.query.filter_by(user_id=current_user.id).order_by(Holiday.date).all()
+    
     if request.method == 'POST':
         # Handle percentage settings
         if 'tax_percent' in request.form:
@@ -1022,13 +1074,14 @@ def settings():
                 total = tax_percent + reinvest_percent + take_home_percent
                 if abs(total - 100.0) > 0.01:  # Allow small floating point differences
                     flash(f'Percentages must sum to 100%. Current sum: {total:.2f}%', 'error')
-                    return render_template('settings.html', settings=settings_obj, workers=workers)
+                    return render_template('settings.html', settings=settings_obj, workers=workers, holidays=holidays)
                 
                 settings_obj.tax_percent = tax_percent
                 settings_obj.reinvest_percent = reinvest_percent
                 settings_obj.take_home_percent = take_home_percent
                 settings_obj.updated_at = datetime.utcnow()
                 db.session.commit()
+                invalidate_user_cache(current_user.id)
                 flash('Settings updated successfully.', 'success')
                 return redirect(url_for('settings'))
                 
@@ -1049,12 +1102,34 @@ def settings():
                 else:
                     worker = Worker(name=worker_name, user_id=current_user.id)
                     db.session.add(worker)
+                    touch_settings(current_user.id)
                     db.session.commit()
+                    invalidate_user_cache(current_user.id)
                     flash(f'Worker "{worker_name}" added successfully.', 'success')
                     return redirect(url_for('settings'))
             else:
                 flash('Worker name cannot be empty.', 'error')
         
+        # Handle renaming a worker (entries reference it by id, so this is a single-row update)
+        elif 'rename_worker' in request.form:
+            worker_id = request.form.get('worker_id', '').strip()
+            new_name = request.form.get('new_name', '').strip()
+            worker = Worker.query.filter_by(id=worker_id, user_id=current_user.id).first() if worker_id else None
+            if not worker:
+                flash('Worker not found.', 'error')
+            elif not new_name:
+                flash('Worker name cannot be empty.', 'error')
+            elif Worker.query.filter(Worker.user_id == current_user.id, Worker.name == new_name, Worker.id != worker.id).first():
+                flash(f'Worker "{new_name}" already exists.', 'error')
+            else:
+                old_name = worker.name
+                worker.name = new_name
+                touch_settings(current_user.id)
+                db.session.commit()
+                invalidate_user_cache(current_user.id)
+                flash(f'Worker "{old_name}" renamed to "{new_name}".', 'success')
+                return redirect(url_for('settings'))
+        
         # Handle setting default worker
         elif 'set_default_worker' in request.form:
             worker_id = request.form.get('default_worker_id', '').strip()
@@ -1064,6 +1139,7 @@ def settings():
                     settings_obj.default_worker_id = worker.id
                     settings_obj.updated_at = datetime.utcnow()
                     db.session.commit()
+                    invalidate_user_cache(current_user.id)
                     flash(f'Default worker set to "{worker.name}".', 'success')
                     return redirect(url_for('settings'))
             else:
@@ -1071,6 +1147,7 @@ def settings():
                 settings_obj.default_worker_id = None
                 settings_obj.updated_at = datetime.utcnow()
                 db.session.commit()
+                invalidate_user_cache(current_user.id)
                 flash('Default worker cleared.', 'success')
                 return redirect(url_for('settings'))
         
@@ -1081,6 +1158,7 @@ def settings():
                 settings_obj.currency_symbol = currency_symbol
                 settings_obj.updated_at = datetime.utcnow()
                 db.session.commit()
+                invalidate_user_cache(current_user.id)
                 flash(f'Currency symbol set to {currency_symbol}.', 'success')
                 return redirect(url_for('settings'))
             else:
@@ -1130,6 +1208,7 @@ def settings():
                 
                 # Commit changes
                 db.session.commit()
+                invalidate_user_cache(current_user.id)
                 flash('Goals and quotas updated successfully.', 'success')
                 return redirect(url_for('settings'))
             except ValueError as e:
@@ -1139,8 +1218,27 @@ def settings():
                 flash(f'Error saving goals: {str(e)}', 'error')
                 import traceback
                 print(f"Error saving goals: {traceback.format_exc()}")
+        
+        # Handle adding a holiday/closure day
+        elif 'add_holiday' in request.form:
+            try:
+                holiday_date = datetime.strptime(request.form.get('holiday_date', ''), '%Y-%m-%d').date()
+            except ValueError:
+                flash('Please enter a valid holiday date.', 'error')
+            else:
+                holiday_name = request.form.get('holiday_name', '').strip() or None
+                existing = Holiday.query.filter_by(user_id=current_user.id, date=holiday_date).first()
+                if existing:
+                    flash(f'{holiday_date.strftime("%b %d, %Y")} is already a holiday.', 'error')
+                else:
+                    db.session.add(Holiday(user_id=current_user.id, date=holiday_date, name=holiday_name))
+                    touch_settings(current_user.id)
+                    db.session.commit()
+                    invalidate_user_cache(current_user.id)
+                    flash(f'Holiday on {holiday_date.strftime("%b %d, %Y")} added.', 'success')
+                    return redirect(url_for('settings'))
     
-    return render_template('settings.html', settings=settings_obj, workers=workers)
+    return render_template('settings.html', settings=settings_obj, workers=workers, holidays=holidays)
 
 
 @app.route('/delete_worker/<int:worker_id>')
@@ -1155,17 +1253,50 @@ def delete_worker(worker_id):
             settings.default_worker_id = None
         
         # Delete entries associated with this worker
-        Entry.query.filter_by(worker_name=worker.name, user_id=current_user.id).delete()
+        Entry.query.filter_by(worker_id=worker.id, user_id=current_user.id).delete()
+        rollup.remove_worker(current_user.id, worker.id)
+        # ...including legacy entries the worker_id backfill has not linked to it yet
+        from migrations.add_entry_worker_id import delete_unlinked_entries
+        delete_unlinked_entries(current_user.id, worker.name)
         
         db.session.delete(worker)
+        touch_settings(current_user.id)
         db.session.commit()
+        invalidate_settings(current_user.id)
+        invalidate_user_cache(current_user.id)
         flash(f'Worker "{worker.name}" deleted successfully.', 'success')
     else:
         flash('Worker not found.', 'error')
     return redirect(url_for('settings'))
 
 
+@app.route('/delete_holiday/<int:holiday_id>')
+@login_required
+def delete_holiday(holiday_id):
+    """Delete a holiday/closure day"""
+    holiday = Holiday.query.filter_by(id=holiday_id, user_id=current_user.id).first()
+    if holiday:
+        db.session.delete(holiday)
+        touch_settings(current_user.id)
+        db.session.commit()
+        invalidate_user_cache(current_user.id)
+        flash(f'Holiday on {holiday.date.strftime("%b %d, %Y")} removed.', 'success')
+    else:
+        flash('Holiday not found.', 'error')
+    return redirect(url_for('settings'))
+
+
+def create_app():
+    """Return the application after one-time database setup (WSGI entry point, see wsgi.py)"""
+    init_db()
+    return app
+
+
 if __name__ == '__main__':
+    if app.config.get('USE_WSGI_SERVER'):
+        # Production: replace this process with gunicorn (workers, threads, timeouts in gunicorn.conf.py)
+        from config import basedir
+        os.execvp('gunicorn', ['gunicorn', '--config', str(basedir / 'gunicorn.conf.py')])
     init_db()
     app.run(host='0.0.0.0', port=5050, debug=True)
 
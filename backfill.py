@@ -0,0 +1,179 @@
+"""
+Chunked, resumable data backfills.
+
+A backfill walks a table in primary key order, a bounded batch of rows at a
+time, up to the highest id present when the run started. Each batch commits
+in its own short transaction together with a checkpoint row in
+backfill_checkpoints, so the write lock is only held briefly (the app keeps
+serving between batches) and an interrupted run picks up after the last
+committed batch when started again.
+
+A backfill is a function that updates one batch:
+
+    def link_workers(conn, first_id, last_id):
+        return conn.execute(text("UPDATE entries SET ... WHERE id BETWEEN :first AND :last"),
+                            {'first': first_id, 'last': last_id}).rowcount
+
+    run_backfill('entries-worker-id', 'entries', link_workers)
+
+It must be safe to re-run on a batch, because a crash between the batch
+and its commit is followed by a retry of the same ids.
+"""
+import time
+from datetime import datetime
+from sqlalchemy import inspect, text
+from models import db, BackfillCheckpoint
+
+BACKFILL_BATCH_SIZE = 2000
+BACKFILL_PAUSE_SECONDS = 0.05  # Gap between batches in which app requests can take the write lock
+PROGRESS_INTERVAL_SECONDS = 5
+
+
+class BackfillReport:
+    """Outcome of one run_backfill() call"""
+
+    def __init__(self, name, last_id, rows_processed, rows_changed, completed, elapsed):
+        self.name = name
+        self.last_id = last_id
+        self.rows_processed = rows_processed
+        self.rows_changed = rows_changed
+        self.completed = completed
+        self.elapsed = elapsed
+
+    @property
+    def rate(self):
+        """Rows processed per second in this run"""
+        return self.rows_processed / self.elapsed if self.elapsed else 0.0
+
+
+def _load_checkpoint(conn, name, table_name):
+    """Checkpoint row for a backfill as a dict, created at id 0 if it has none yet"""
+    checkpoints = BackfillCheckpoint.__table__
+    checkpoints.create(conn, checkfirst=True)
+    row = conn.execute(checkpoints.select().where(checkpoints.c.name == name)).mappings().first()
+    if row is None:
+        conn.execute(checkpoints.insert().values(name=name, table_name=table_name, last_id=0,
+                                                 rows_processed=0, rows_changed=0,
+                                                 started_at=datetime.utcnow(), updated_at=datetime.utcnow()))
+        conn.commit()
+        row = conn.execute(checkpoints.select().where(checkpoints.c.name == name)).mappings().first()
+    elif row['table_name'] != table_name:
+        raise ValueError(f'Backfill {name} was started on table {row["table_name"]}, not {table_name}.')
+    return dict(row)
+
+
+def register_backfill(conn, name, table_name):
+    """Record a backfill as pending (checkpoint at id 0) without running it"""
+    return _load_checkpoint(conn, name, table_name)
+
+
+def _save_checkpoint(conn, name, **values):
+    checkpoints = BackfillCheckpoint.__table__
+    conn.execute(checkpoints.update().where(checkpoints.c.name == name).values(updated_at=datetime.utcnow(), **values))
+
+
+def run_backfill(name, table_name, process_batch, batch_size=BACKFILL_BATCH_SIZE,
+                 pause=BACKFILL_PAUSE_SECONDS, max_batches=None, restart=False):
+    """Run (or resume) a backfill over every row of a table, batch by batch.
+
+    Args:
+        name: Unique name of the backfill, the key of its checkpoint
+        table_name: Table to walk; its primary key must be an integer id column
+        process_batch: Function (conn, first_id, last_id) -> rows changed, run in the batch's transaction
+        batch_size: Rows per batch (and per transaction)
+        pause: Seconds to sleep between batches
+        max_batches: Stop after this many batches (the next run resumes)
+        restart: Start over from the first row even if a checkpoint exists
+
+    Returns:
+        BackfillReport for this run
+    """
+    started = time.monotonic()
+    processed = changed = batches = 0
+    with db.engine.connect() as conn:
+        if restart:
+            conn.execute(BackfillCheckpoint.__table__.delete().where(BackfillCheckpoint.name == name))
+            conn.commit()
+        checkpoint = _load_checkpoint(conn, name, table_name)
+        last_id = checkpoint['last_id']
+        if checkpoint['completed_at'] is not None:
+            print(f"Backfill {name} already completed at {checkpoint['completed_at']:%Y-%m-%d %H:%M}.")
+            return BackfillReport(name, last_id, 0, 0, True, 0.0)
+
+        # Rows added after this point are written by current code and need no backfill
+        end_id, remaining = conn.execute(text(f"SELECT MAX(id), COUNT(*) FROM {table_name} WHERE id > :last_id"),
+                                         {'last_id': last_id}).one()
+        conn.commit()
+        action = 'Resuming' if last_id else 'Starting'
+        print(f"{action} backfill {name} on {table_name} after id {last_id} ({remaining} rows to go)...")
+
+        next_report = started + PROGRESS_INTERVAL_SECONDS
+        completed = False
+        try:
+            while max_batches is None or batches < max_batches:
+                # Keyset step: the ids of the next batch, found through the primary key
+                bounds = conn.execute(text(
+                    f"SELECT MIN(id), MAX(id), COUNT(*) FROM "
+                    f"(SELECT id FROM {table_name} WHERE id > :last_id AND id <= :end_id ORDER BY id LIMIT :limit)"
+                ), {'last_id': last_id, 'end_id': end_id or 0, 'limit': batch_size}).one()
+                first_id, batch_last_id, rows = bounds
+                if not rows:
+                    _save_checkpoint(conn, name, completed_at=datetime.utcnow())
+                    conn.commit()
+                    completed = True
+                    break
+
+                batch_changed = process_batch(conn, first_id, batch_last_id) or 0
+                _save_checkpoint(
+                    conn, name,
+                    last_id=batch_last_id,
+                    rows_processed=BackfillCheckpoint.rows_processed + rows,
+                    rows_changed=BackfillCheckpoint.rows_changed + batch_changed
+                )
+                conn.commit()
+                last_id = batch_last_id
+                processed += rows
+                changed += batch_changed
+                batches += 1
+
+                now = time.monotonic()
+                if now >= next_report:
+                    rate = processed / (now - started)
+                    left = max(remaining - processed, 0)
+                    eta = f", ~{left / rate:.0f}s left" if rate else ''
+                    print(f"  {name}: {processed}/{remaining} rows, {rate:.0f} rows/s{eta} (at id {last_id})")
+                    next_report = now + PROGRESS_INTERVAL_SECONDS
+                if pause:
+                    time.sleep(pause)
+        except KeyboardInterrupt:
+            conn.rollback()
+            print(f"✗ Backfill {name} interrupted after id {last_id}; run it again to resume.")
+        except Exception:
+            conn.rollback()
+            print(f"✗ Backfill {name} failed after id {last_id}; fix the cause and run it again to resume.")
+            raise
+
+    report = BackfillReport(name, last_id, processed, changed, completed, time.monotonic() - started)
+    if completed:
+        print(f"✓ Backfill {name} completed: {processed} rows processed, {changed} changed "
+              f"in {report.elapsed:.1f}s ({report.rate:.0f} rows/s)")
+    return report
+
+
+def is_backfill_unfinished(conn, name):
+    """True when a backfill was started and has not completed yet"""
+    if not inspect(conn).has_table(BackfillCheckpoint.__tablename__):
+        return False
+    checkpoints = BackfillCheckpoint.__table__
+    return conn.execute(
+        checkpoints.select().where(checkpoints.c.name == name, checkpoints.c.completed_at.is_(None))
+    ).first() is not None
+
+
+def backfill_status():
+    """Checkpoint rows of every backfill that has been started, oldest first"""
+    checkpoints = BackfillCheckpoint.__table__
+    with db.engine.connect() as conn:
+        checkpoints.create(conn, checkfirst=True)
+        conn.commit()
+        return [dict(row) for row in conn.execute(checkpoints.select().order_by(checkpoints.c.started_at)).mappings()]
@@ -0,0 +1,150 @@
+"""
+Synthetic dataset generator for benchmarks and load tests
+Creates users, each with workers, a settings row, public holidays and years of
+daily entries, then builds the daily_totals rollup. The same seed always
+gives the same data (relative to today, so the dashboard's recent windows
+are populated).
+
+Entries follow the shape of real shop data: work on the user's workdays
+(Mon-Fri, occasional Saturdays), a few days off per worker, mostly one entry
+per worker per day, hours around a normal working day, and revenue per hour
+that varies by worker, season and weekday.
+
+Run this script: python3 benchmarks/dataset.py --preset 10x --database /tmp/bench.db
+"""
+import argparse
+import math
+import os
+import random
+import sys
+from datetime import date, timedelta
+from pathlib import Path
+
+# Add parent directory to path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+# (users, workers per user, years of history, entries per worker-workday).
+# "current" is roughly the shop's real history; the others scale its row count.
+PRESETS = {
+    'current': (1, 3, 2, 1.1),       # ~1.7k entries
+    '10x': (1, 6, 10, 1.1),          # ~17k entries
+    '100x': (4, 10, 12, 1.35),       # ~165k entries
+}
+WORKER_NAMES = ('Alice', 'Bob', 'Carol', 'Dan', 'Eve', 'Frank', 'Grace', 'Heidi', 'Ivan', 'Judy',
+                'Mallory', 'Niaj', 'Olivia', 'Peggy', 'Rupert', 'Sybil', 'Trent', 'Victor', 'Walter', 'Zoe')
+BENCHMARK_PASSWORD = 'benchmark'
+INSERT_CHUNK = 5000
+
+
+def username(n):
+    """Login name of the n-th generated user"""
+    return 'bench' if n == 0 else f'bench{n}'
+
+
+def _entries_for_worker(rng, user_id, worker_id, start, end, per_day):
+    """Entry rows for one worker over [start, end]"""
+    rate = rng.lognormvariate(math.log(45), 0.25)  # This worker's typical revenue per hour
+    rows = []
+    day = start
+    while day <= end:
+        weekday = day.weekday()
+        works = weekday < 5 or (weekday == 5 and rng.random() < 0.15)
+        if works and rng.random() > 0.06:  # Vacation and sick days
+            count = int(per_day) + (1 if rng.random() < per_day - int(per_day) else 0)
+            season = 1 + 0.2 * math.sin(2 * math.pi * (day.timetuple().tm_yday - 80) / 365)
+            weekday_factor = 1.15 if weekday == 4 else 0.9 if weekday == 0 else 1.0
+            for _ in range(count):
+                hours = round(min(max(rng.gauss(7.5 / count, 1.5), 1.0), 12.0), 1)
+                revenue = round(max(hours * rate * season * weekday_factor * rng.gauss(1, 0.2), 0), 2)
+                rows.append({
+                    'user_id': user_id,
+                    'worker_id': worker_id,
+                    'worker_name': None,
+                    'date': day,
+                    'hours': hours,
+                    'revenue': revenue,
+                    'notes': 'Overtime' if hours > 10 else ''
+                })
+        day += timedelta(days=1)
+    return rows
+
+
+def generate(users=1, workers=3, years=2, per_day=1.1, seed=42, today=None):
+    """Fill the current database with synthetic data (must run inside an app context).
+
+    Returns:
+        Number of entries created
+    """
+    from sqlalchemy import insert, text
+    from models import db, User, Entry, Settings, Worker, Holiday
+    from schema import ensure_schema
+    import rollup
+
+    rng = random.Random(seed)
+    today = today or date.today()
+    start = today - timedelta(days=int(365.25 * years))
+    ensure_schema()
+
+    total = 0
+    for n in range(users):
+        user = User(username=username(n))
+        user.set_password(BENCHMARK_PASSWORD)
+        db.session.add(user)
+        db.session.flush()
+        db.session.add(Settings(user_id=user.id, tax_percent=25.0, reinvest_percent=20.0, take_home_percent=55.0,
+                                daily_revenue_goal=1000.0, monthly_revenue_goal=20000.0,
+                                target_days_per_month=21, workdays_of_week='0,1,2,3,4'))
+        user_workers = [Worker(name=WORKER_NAMES[i % len(WORKER_NAMES)] + ('' if i < len(WORKER_NAMES) else f' {i}'),
+                               user_id=user.id, is_default=(i == 0)) for i in range(workers)]
+        db.session.add_all(user_workers)
+        for year in range(start.year, today.year + 1):
+            db.session.add_all([Holiday(user_id=user.id, date=date(year, 1, 1), name='New Year'),
+                                Holiday(user_id=user.id, date=date(year, 12, 25), name='Christmas')])
+        db.session.flush()
+
+        for worker in user_workers:
+            rows = _entries_for_worker(rng, user.id, worker.id, start, today, per_day)
+            for chunk_start in range(0, len(rows), INSERT_CHUNK):
+                db.session.execute(insert(Entry.__table__), rows[chunk_start:chunk_start + INSERT_CHUNK])
+            total += len(rows)
+        db.session.commit()
+
+    rollup.rebuild()
+    db.session.execute(text('ANALYZE'))
+    db.session.commit()
+    return total
+
+
+def generate_preset(preset, seed=42):
+    """generate() with one of the PRESETS"""
+    users, workers, years, per_day = PRESETS[preset]
+    return generate(users=users, workers=workers, years=years, per_day=per_day, seed=seed)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Fill a new database with synthetic entries.')
+    parser.add_argument('--database', required=True, help='SQLite file to create (must not exist)')
+    parser.add_argument('--preset', choices=sorted(PRESETS), default='current')
+    parser.add_argument('--users', type=int, help='Override the preset')
+    parser.add_argument('--workers', type=int, help='Workers per user (overrides the preset)')
+    parser.add_argument('--years', type=float, help='Years of history (overrides the preset)')
+    parser.add_argument('--per-day', type=float, help='Entries per worker per workday (overrides the preset)')
+    parser.add_argument('--seed', type=int, default=42)
+    args = parser.parse_args()
+
+    if os.path.exists(args.database):
+        print(f"✗ {args.database} already exists; choose a new file.")
+        return False
+    os.environ['DATABASE_URL'] = f'sqlite:///{os.path.abspath(args.database)}'
+    from app import app
+
+    users, workers, years, per_day = PRESETS[args.preset]
+    with app.app_context():
+        total = generate(users=args.users or users, workers=args.workers or workers,
+                         years=args.years or years, per_day=args.per_day or per_day, seed=args.seed)
+    print(f"✓ Created {total} entries in {args.database} (log in as '{username(0)}' / '{BENCHMARK_PASSWORD}')")
+    return True
+
+
+if __name__ == '__main__':
+    sys.exit(0 if main() else 1)
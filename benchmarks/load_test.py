@@ -0,0 +1,313 @@
+#!/usr/bin/env python3
+"""
+Concurrent load test
+Generates a synthetic dataset (benchmarks/dataset.py) in a scratch database,
+serves the app on a local port and drives it with many client threads over
+HTTP. By default the app runs in this process on a threaded Werkzeug server;
+--server gunicorn starts the production server instead (gunicorn.conf.py:
+WEB_WORKERS, WEB_THREADS, gthread, preload), to validate serving changes.
+Each client logs in and then loops without pause (a closed loop) over a mix
+of dashboard views, chart fetches, entry adds (batch API) and deletes of
+entries it added. Reports throughput, latency percentiles per action and
+errors. SQLite lock errors ("database is locked"/"busy") are counted where
+the driver raises them, since some routes turn a failed write into a flash
+message rather than a 500 (under gunicorn they are counted from the server's
+error log). Finally the daily_totals rollup is compared with what a rebuild
+would write, since lost rollup updates show up in no response.
+
+SQLite and pool settings come from the usual environment variables, so a
+tuning change can be tried before deploying it:
+    SQLITE_SYNCHRONOUS=FULL python3 benchmarks/load_test.py --clients 16
+
+Run this script: python3 benchmarks/load_test.py --preset 10x --clients 8 --duration 30
+Through gunicorn: WEB_WORKERS=2 python3 benchmarks/load_test.py --server gunicorn --clients 16
+"""
+import argparse
+import http.cookiejar
+import json
+import logging
+import os
+import random
+import shutil
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import urllib.error
+import urllib.parse
+import urllib.request
+from collections import Counter, defaultdict
+from contextlib import contextmanager
+from pathlib import Path
+
+# Add parent directory to path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from dataset import PRESETS, BENCHMARK_PASSWORD, username, generate_preset
+from run_benchmarks import percentile
+
+# Share of each action in the traffic mix
+ACTION_WEIGHTS = {
+    'dashboard': 40,
+    'chart': 30,
+    'add_entry': 20,
+    'delete_entry': 10,
+}
+CHART_PERIODS = ('daily', 'weekly', 'monthly')
+REQUEST_TIMEOUT = 30
+SERVER_START_TIMEOUT = 60
+PROJECT_DIR = Path(__file__).parent.parent
+
+
+class _NoRedirect(urllib.request.HTTPRedirectHandler):
+    """Report redirects instead of following them, so each action is one request"""
+
+    def redirect_request(self, req, fp, code, msg, headers, newurl):
+        return None
+
+
+class LoadClient:
+    """One simulated user session: a cookie jar and the ids of the entries it added"""
+
+    def __init__(self, base_url, user_index, seed):
+        self.base_url = base_url
+        self.user_index = user_index
+        self.rng = random.Random(seed)
+        self.added_ids = []
+        self.opener = urllib.request.build_opener(
+            urllib.request.HTTPCookieProcessor(http.cookiejar.CookieJar()), _NoRedirect)
+
+    def request(self, path, data=None, json_body=None):
+        """Status code of one request (redirects count as successful responses)"""
+        headers = {}
+        if json_body is not None:
+            data = json.dumps(json_body).encode()
+            headers['Content-Type'] = 'application/json'
+        elif data is not None:
+            data = urllib.parse.urlencode(data).encode()
+        req = urllib.request.Request(self.base_url + path, data=data, headers=headers)
+        try:
+            with self.opener.open(req, timeout=REQUEST_TIMEOUT) as response:
+                self.last_body = response.read()
+                return response.status
+        except urllib.error.HTTPError as e:
+            self.last_body = e.read()
+            return e.code
+
+    def login(self):
+        status = self.request('/login', data={'username': username(self.user_index),
+                                              'password': BENCHMARK_PASSWORD})
+        if status != 302:
+            raise RuntimeError(f'Login as {username(self.user_index)} failed with {status}')
+
+    def run_action(self, action):
+        """Perform one action; returns (action actually run, status)"""
+        if action == 'delete_entry' and not self.added_ids:
+            action = 'add_entry'
+        if action == 'dashboard':
+            return action, self.request('/dashboard')
+        if action == 'chart':
+            return action, self.request(f'/api/chart_data?period={self.rng.choice(CHART_PERIODS)}')
+        if action == 'add_entry':
+            day = time.strftime('%Y-%m-%d', time.localtime(time.time() - self.rng.randint(0, 60) * 86400))
+            status = self.request('/api/entries/batch', json_body={'operations': [{
+                'op': 'create', 'date': day, 'hours': round(self.rng.uniform(2, 9), 1),
+                'revenue': round(self.rng.uniform(80, 600), 2), 'notes': 'load test'
+            }]})
+            if status == 200:
+                self.added_ids.extend(result['id'] for result in json.loads(self.last_body)['results'])
+            return action, status
+        entry_id = self.added_ids.pop(self.rng.randrange(len(self.added_ids)))
+        return action, self.request(f'/delete_entry/{entry_id}')
+
+
+def _client_loop(client, deadline, results, errors, lock):
+    actions = list(ACTION_WEIGHTS)
+    weights = list(ACTION_WEIGHTS.values())
+    while time.monotonic() < deadline:
+        action = client.rng.choices(actions, weights)[0]
+        started = time.perf_counter()
+        try:
+            action, status = client.run_action(action)
+        except Exception as e:
+            results.append((action, time.perf_counter() - started, None))
+            with lock:
+                errors[f'{action}: {type(e).__name__}: {e}'] += 1
+            continue
+        results.append((action, time.perf_counter() - started, status))
+        if status >= 500:
+            with lock:
+                errors[f'{action}: HTTP {status}'] += 1
+
+
+@contextmanager
+def werkzeug_server(app, lock_errors, lock):
+    """Serve the app from a threaded Werkzeug server in this process; yields the base URL"""
+    from sqlalchemy import event
+    from werkzeug.serving import make_server
+    from models import db
+
+    def count_lock_errors(context):
+        message = str(context.original_exception).lower()
+        if 'locked' in message or 'busy' in message:
+            with lock:
+                lock_errors[str(context.original_exception)] += 1
+
+    with app.app_context():
+        engine = db.engine
+    event.listen(engine, 'handle_error', count_lock_errors)
+
+    logging.getLogger('werkzeug').setLevel(logging.ERROR)  # No access log line per request
+    server = make_server('127.0.0.1', 0, app, threaded=True)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    try:
+        yield f'http://127.0.0.1:{server.server_port}'
+    finally:
+        server.shutdown()
+        event.remove(engine, 'handle_error', count_lock_errors)
+
+
+def _free_port():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+def _log_tail(log_path, lines=20):
+    with open(log_path, errors='replace') as log:
+        return ''.join(log.readlines()[-lines:])
+
+
+@contextmanager
+def gunicorn_server(lock_errors, log_path):
+    """Run gunicorn with gunicorn.conf.py on a local port (same environment, so the same database); yields the base URL"""
+    port = _free_port()
+    base_url = f'http://127.0.0.1:{port}'
+    env = dict(os.environ, WEB_BIND=f'127.0.0.1:{port}')
+    with open(log_path, 'w') as log:
+        process = subprocess.Popen(['gunicorn', '--config', str(PROJECT_DIR / 'gunicorn.conf.py')],
+                                   cwd=PROJECT_DIR, env=env, stdout=log, stderr=subprocess.STDOUT)
+    try:
+        deadline = time.monotonic() + SERVER_START_TIMEOUT
+        while True:
+            if process.poll() is not None:
+                raise RuntimeError(f'gunicorn exited with {process.returncode}:\n{_log_tail(log_path)}')
+            try:
+                urllib.request.urlopen(base_url + '/login', timeout=1).close()
+                break
+            except (urllib.error.URLError, OSError):
+                if time.monotonic() > deadline:
+                    raise RuntimeError(f'gunicorn did not answer within {SERVER_START_TIMEOUT}s:\n{_log_tail(log_path)}')
+                time.sleep(0.2)
+        yield base_url
+    finally:
+        process.terminate()
+        process.wait(timeout=30)
+        # Failed requests are logged with their traceback; swallowed write errors are not visible here
+        with open(log_path, errors='replace') as log:
+            for line in log:
+                if line.startswith('sqlalchemy.exc.OperationalError') and ('locked' in line or 'busy' in line):
+                    lock_errors[line.split(') ', 1)[-1].strip()] += 1
+
+
+def run_load_test(app, clients=8, duration=30, users=1, seed=42, server='werkzeug', log_path=None):
+    """Serve the app on a local port and drive it; returns (results, errors, lock_errors, elapsed)"""
+    lock = threading.Lock()
+    lock_errors = Counter()
+    serving = gunicorn_server(lock_errors, log_path) if server == 'gunicorn' else werkzeug_server(app, lock_errors, lock)
+
+    results = []
+    errors = Counter()
+    with serving as base_url:
+        load_clients = [LoadClient(base_url, n % users, seed + n) for n in range(clients)]
+        for client in load_clients:
+            client.login()
+        started = time.monotonic()
+        deadline = started + duration
+        threads = [threading.Thread(target=_client_loop, args=(client, deadline, results, errors, lock))
+                   for client in load_clients]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        elapsed = time.monotonic() - started
+    return results, errors, lock_errors, elapsed
+
+
+def report(results, errors, lock_errors, drift, elapsed, clients):
+    """Print throughput, latency per action, errors and rollup drift; returns True when nothing failed"""
+    print(f"\n{len(results)} requests from {clients} clients in {elapsed:.1f}s: "
+          f"{len(results) / elapsed:.1f} requests/s")
+    by_action = defaultdict(list)
+    for action, seconds, status in results:
+        by_action[action].append(seconds * 1000)
+    all_ms = [seconds * 1000 for _, seconds, _ in results]
+    print(f"\n{'action':<14} {'requests':>8} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'max ms':>8}")
+    for action, timings in sorted(by_action.items()) + [('all', all_ms)]:
+        if timings:
+            print(f"{action:<14} {len(timings):>8} {statistics.median(timings):>8.1f} "
+                  f"{percentile(timings, 0.95):>8.1f} {percentile(timings, 0.99):>8.1f} {max(timings):>8.1f}")
+
+    statuses = Counter(status for _, _, status in results)
+    print(f"\nStatus codes: {', '.join(f'{status}: {count}' for status, count in sorted(statuses.items(), key=str))}")
+    failed = sum(errors.values())
+    locked = sum(lock_errors.values())
+    for message, count in errors.most_common():
+        print(f"  ✗ {count} x {message}")
+    for message, count in lock_errors.most_common():
+        print(f"  ✗ {count} x SQLite lock error: {message}")
+    for key, stored, expected in drift[:10]:
+        print(f"  ✗ Rollup row {key}: stored {stored}, entries say {expected}")
+    if failed or locked or drift:
+        print(f"✗ {failed} failed requests, {locked} SQLite lock errors, {len(drift)} rollup rows out of step")
+        return False
+    print("✓ No failed requests, no SQLite lock errors, and the rollup matches a rebuild.")
+    return True
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Drive the app with concurrent mixed read/write traffic.')
+    parser.add_argument('--preset', choices=sorted(PRESETS), default='current')
+    parser.add_argument('--clients', type=int, default=8, help='Concurrent client threads')
+    parser.add_argument('--duration', type=float, default=30, help='Seconds of load')
+    parser.add_argument('--database', help='Existing dataset to use (copied first, so it is not modified)')
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--server', choices=('werkzeug', 'gunicorn'), default='werkzeug',
+                        help='In-process threaded server, or gunicorn with gunicorn.conf.py')
+    args = parser.parse_args()
+
+    scratch = Path(tempfile.mkdtemp(prefix='load-test-'))
+    db_path = scratch / 'load_test.db'
+    if args.database:
+        shutil.copyfile(args.database, db_path)
+    os.environ['DATABASE_URL'] = f'sqlite:///{db_path}'
+    os.environ['SLOW_QUERY_LOG'] = str(scratch / 'slow_queries.log')
+    os.environ.setdefault('SQLITE_JOURNAL_MODE', 'WAL')  # As in production, whatever FLASK_ENV says
+    from app import app
+    import rollup
+
+    try:
+        with app.app_context():
+            if not args.database:
+                total = generate_preset(args.preset, seed=args.seed)
+                print(f"Generated {total} entries ({args.preset})")
+            users = PRESETS[args.preset][0] if not args.database else 1
+        serving = (f"gunicorn, {app.config['WEB_WORKERS']} workers x {app.config['WEB_THREADS']} threads"
+                   if args.server == 'gunicorn' else 'Werkzeug, threaded')
+        print(f"Running {args.clients} clients for {args.duration:.0f}s ({serving}; "
+              f"SQLite {app.config['SQLITE_PRAGMAS']}, pool {app.config['SQLALCHEMY_ENGINE_OPTIONS']})...")
+        results, errors, lock_errors, elapsed = run_load_test(app, args.clients, args.duration, users, args.seed,
+                                                              server=args.server,
+                                                              log_path=scratch / 'gunicorn.log')
+        with app.app_context():
+            drift = rollup.find_drift()
+    finally:
+        shutil.rmtree(scratch, ignore_errors=True)
+    return report(results, errors, lock_errors, drift, elapsed, args.clients)
+
+
+if __name__ == '__main__':
+    sys.exit(0 if main() else 1)
@@ -0,0 +1,196 @@
+#!/usr/bin/env python3
+"""
+Benchmarks for the hot routes
+Generates a synthetic dataset (benchmarks/dataset.py) in a scratch database,
+drives the dashboard, the chart API for all three periods, the entries
+listing (first page and a page deep in history) and add_entry POSTs through
+the Flask test client, and reports p50/p95 latency and SQL statements per
+request for each. Results are compared with benchmarks/baseline.json; the
+script exits non-zero when a route issues more queries than its baseline or
+its median is clearly slower (p95 is shown but, over a few dozen requests,
+too noisy to fail on).
+
+Result caching is off so every request computes its page from the database.
+Latency depends on the machine, so record the baseline on the machine you
+compare on (the Pi, or your laptop for relative changes). Query counts do not.
+
+Run this script: python3 benchmarks/run_benchmarks.py --preset 10x
+Record a baseline: python3 benchmarks/run_benchmarks.py --preset 10x --save-baseline
+"""
+import argparse
+import json
+import math
+import os
+import platform
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+from datetime import date, datetime, timedelta
+from pathlib import Path
+
+# Add parent directory to path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from dataset import PRESETS, BENCHMARK_PASSWORD, username, generate_preset
+
+BASELINE_FILE = Path(__file__).parent / 'baseline.json'
+ITERATIONS = 30
+WARMUP = 3
+# A route regresses when its p50 exceeds the baseline by this fraction and by at least MIN_SLOWDOWN_MS
+P50_TOLERANCE = 0.25
+MIN_SLOWDOWN_MS = 2.0
+
+# (name, method, path); None paths are filled in once the data exists
+BENCHMARKS = [
+    ('dashboard', 'GET', '/dashboard'),
+    ('chart_daily', 'GET', '/api/chart_data?period=daily'),
+    ('chart_weekly', 'GET', '/api/chart_data?period=weekly'),
+    ('chart_monthly', 'GET', '/api/chart_data?period=monthly'),
+    ('entries_first_page', 'GET', '/entries'),
+    ('entries_deep_page', 'GET', None),
+    ('add_entry', 'POST', '/add_entry'),
+]
+
+
+def percentile(values, fraction):
+    """Nearest-rank percentile of a list of numbers"""
+    ordered = sorted(values)
+    return ordered[max(math.ceil(fraction * len(ordered)) - 1, 0)]
+
+
+def run_benchmarks(app, iterations=ITERATIONS):
+    """Time every benchmark; returns {name: {'p50_ms', 'p95_ms', 'queries'}}"""
+    from sqlalchemy import event
+    from models import db, User, Entry, Worker
+    from pagination import encode_cursor
+
+    query_count = [0]
+
+    def count_query(conn, cursor, statement, parameters, context, executemany):
+        query_count[0] += 1
+
+    client = app.test_client()
+    client.post('/login', data={'username': username(0), 'password': BENCHMARK_PASSWORD})
+    user = User.query.filter_by(username=username(0)).first()
+    worker = Worker.query.filter_by(user_id=user.id).first()
+    # 90% of the way back through the user's history
+    total = Entry.query.filter_by(user_id=user.id).count()
+    deep_entry = Entry.query.filter_by(user_id=user.id).order_by(Entry.date, Entry.id).offset(total // 10).first()
+    deep_page = f'/entries?after={encode_cursor(deep_entry)}'
+
+    results = {}
+    event.listen(db.engine, 'before_cursor_execute', count_query)
+    try:
+        for name, method, path in BENCHMARKS:
+            path = path or deep_page
+            timings = []
+            queries = []
+            for i in range(WARMUP + iterations):
+                form = None
+                if method == 'POST':
+                    form = {'date': (date.today() - timedelta(days=i % 30)).isoformat(), 'hours': '7.5',
+                            'revenue': '350', 'worker_id': str(worker.id), 'notes': 'benchmark'}
+                query_count[0] = 0
+                started = time.perf_counter()
+                response = client.open(path, method=method, data=form)
+                response.get_data()
+                elapsed = time.perf_counter() - started
+                response.close()
+                if response.status_code not in (200, 302):
+                    raise RuntimeError(f"{method} {path} returned {response.status_code}")
+                with client.session_transaction() as session:
+                    session.pop('_flashes', None)  # Not shown, so they would pile up in the cookie
+                if i >= WARMUP:
+                    timings.append(elapsed * 1000)
+                    queries.append(query_count[0])
+            results[name] = {
+                'p50_ms': round(statistics.median(timings), 2),
+                'p95_ms': round(percentile(timings, 0.95), 2),
+                'queries': int(statistics.median(queries))
+            }
+            print(f"  {name:<20} p50 {results[name]['p50_ms']:>8.2f} ms   p95 {results[name]['p95_ms']:>8.2f} ms   "
+                  f"{results[name]['queries']:>3} queries")
+    finally:
+        event.remove(db.engine, 'before_cursor_execute', count_query)
+    return results
+
+
+def compare(results, baseline):
+    """Print each route against its baseline; returns the names of regressed routes"""
+    regressions = []
+    print(f"\n{'route':<20} {'p50 ms':>9} {'baseline':>9} {'change':>8} {'p95 ms':>9} {'baseline':>9}   queries (baseline)")
+    for name, result in results.items():
+        base = baseline.get(name)
+        if base is None:
+            print(f"{name:<20} {result['p50_ms']:>9.2f} {'-':>9} {'-':>8} {result['p95_ms']:>9.2f} {'-':>9}   "
+                  f"{result['queries']} (-)")
+            continue
+        change = (result['p50_ms'] - base['p50_ms']) / base['p50_ms'] if base['p50_ms'] else 0.0
+        slower = change > P50_TOLERANCE and result['p50_ms'] - base['p50_ms'] > MIN_SLOWDOWN_MS
+        more_queries = result['queries'] > base['queries']
+        mark = '✗' if slower or more_queries else ' '
+        print(f"{name:<20} {result['p50_ms']:>9.2f} {base['p50_ms']:>9.2f} {change:>+8.0%} "
+              f"{result['p95_ms']:>9.2f} {base['p95_ms']:>9.2f}   {result['queries']} ({base['queries']}) {mark}")
+        if slower or more_queries:
+            regressions.append(name)
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark the hot routes against a synthetic dataset.')
+    parser.add_argument('--preset', choices=sorted(PRESETS), default='current')
+    parser.add_argument('--iterations', type=int, default=ITERATIONS)
+    parser.add_argument('--database', help='Existing dataset to benchmark (copied first, so it is not modified)')
+    parser.add_argument('--save-baseline', action='store_true', help='Store these results as the baseline for the preset')
+    args = parser.parse_args()
+
+    scratch = Path(tempfile.mkdtemp(prefix='benchmark-'))
+    db_path = scratch / 'benchmark.db'
+    if args.database:
+        shutil.copyfile(args.database, db_path)
+    os.environ['DATABASE_URL'] = f'sqlite:///{db_path}'
+    os.environ['RESULT_CACHE_SIZE'] = '0'
+    os.environ.setdefault('SQLITE_JOURNAL_MODE', 'WAL')  # As in production, whatever FLASK_ENV says
+    os.environ['SLOW_QUERY_LOG'] = str(scratch / 'slow_queries.log')
+    from app import app
+
+    try:
+        with app.app_context():
+            if not args.database:
+                started = time.perf_counter()
+                total = generate_preset(args.preset)
+                print(f"Generated {total} entries ({args.preset}) in {time.perf_counter() - started:.1f}s")
+            print(f"Running {args.iterations} iterations per route...")
+            results = run_benchmarks(app, args.iterations)
+    finally:
+        shutil.rmtree(scratch, ignore_errors=True)
+
+    baselines = json.loads(BASELINE_FILE.read_text()) if BASELINE_FILE.exists() else {}
+    label = 'custom' if args.database else args.preset
+    if args.save_baseline:
+        baselines[label] = {
+            'recorded': datetime.now().strftime('%Y-%m-%d %H:%M'),
+            'machine': f'{platform.machine()} {platform.system()} Python {platform.python_version()}',
+            'routes': results
+        }
+        BASELINE_FILE.write_text(json.dumps(baselines, indent=2, sort_keys=True) + '\n')
+        print(f"✓ Baseline for {label} saved to {BASELINE_FILE}")
+        return True
+
+    baseline = baselines.get(label)
+    if baseline is None:
+        print(f"No baseline for {label} yet; record one with --save-baseline.")
+        return True
+    print(f"Baseline recorded {baseline['recorded']} on {baseline['machine']}")
+    regressions = compare(results, baseline['routes'])
+    if regressions:
+        print(f"\n✗ {len(regressions)} routes regressed: {', '.join(regressions)}")
+        return False
+    print("\n✓ No regressions against the baseline.")
+    return True
+
+
+if __name__ == '__main__':
+    sys.exit(0 if main() else 1)
@@ -0,0 +1,63 @@
+"""
+In-process result cache for computed per-user payloads.
+
+Keys are tuples whose first element is the user id, so every cached result
+belonging to a user can be dropped at once when one of their writes lands.
+An optional ttl (seconds) additionally expires entries by age.
+"""
+from collections import OrderedDict
+import threading
+import time
+
+
+class LRUCache:
+    """Thread-safe cache holding at most max_entries items, evicting the least recently used"""
+
+    def __init__(self, max_entries=256, ttl=None):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key):
+        """Return the cached value for key, or None if absent"""
+        with self._lock:
+            try:
+                value, expires_at = self._data[key]
+            except KeyError:
+                self.misses += 1
+                return None
+            if expires_at is not None and time.monotonic() >= expires_at:
+                del self._data[key]
+                self.misses += 1
+                return None
+            self._data.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def set(self, key, value):
+        """Store value under key, evicting the oldest entries beyond max_entries"""
+        if self.max_entries <= 0:
+            return
+        expires_at = time.monotonic() + self.ttl if self.ttl else None
+        with self._lock:
+            self._data[key] = (value, expires_at)
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_entries:
+                self._data.popitem(last=False)
+
+    def invalidate_user(self, user_id):
+        """Drop every entry whose key belongs to user_id"""
+        with self._lock:
+            for key in [k for k in self._data if k[0] == user_id]:
+                del self._data[key]
+
+    def clear(self):
+        """Drop all entries"""
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self):
+        return len(self._data)
@@ -0,0 +1,152 @@
+#!/usr/bin/env python3
+"""
+Query plan regression check
+Seeds a throwaway database, drives the dashboard, chart API and entries
+pages through the Flask test client, then runs EXPLAIN QUERY PLAN on every
+SELECT they issued. Exits non-zero if any query falls back to a full table scan.
+Run this script: python3 check_query_plans.py
+"""
+import os
+import sys
+import tempfile
+import random
+from datetime import date, timedelta
+
+# Point the app at a scratch database and disable result caching before importing it
+_db_file = tempfile.NamedTemporaryFile(suffix='.db', delete=False)
+_db_file.close()
+os.environ['DATABASE_URL'] = f'sqlite:///{_db_file.name}'
+os.environ['RESULT_CACHE_SIZE'] = '0'
+
+from sqlalchemy import event, text
+from app import app
+from models import db, User, Entry, Settings, Worker, Holiday
+import rollup
+from pagination import encode_cursor
+
+# Pages to exercise; every SELECT they run is checked
+ROUTES = [
+    '/dashboard',
+    '/dashboard?worker=1&recent_period=thismonth',
+    '/dashboard?recent_period=3months',
+    '/api/chart_data?period=daily',
+    '/api/chart_data?period=weekly&worker=Alice',
+    '/api/chart_data?period=monthly',
+    '/api/chart_data?period=monthly&worker=2',
+    '/api/chart_series',
+    '/api/chart_series?worker=1',
+    '/entries',
+    '/entries?worker=1',
+    '/export_entries',
+    '/export_entries?format=ndjson&worker=2&start=2024-01-01&end=2024-12-31',
+]
+
+
+def seed(user_count=4, entries_per_user=1000):
+    """Create several users, each with workers, a holiday and a spread of entries.
+
+    More than one user is needed so that user_id is selective, as it is in
+    any real multi-user database, once ANALYZE statistics are in place.
+    """
+    random.seed(42)
+    db.create_all()
+    today = date.today()
+    for n in range(user_count):
+        user = User(username='plancheck' if n == 0 else f'plancheck{n}')
+        user.set_password('plancheck')
+        db.session.add(user)
+        db.session.flush()
+        db.session.add(Settings(user_id=user.id))
+        workers = [Worker(name=name, user_id=user.id) for name in ('Alice', 'Bob', 'Carol')]
+        db.session.add_all(workers)
+        db.session.add(Holiday(user_id=user.id, date=today))
+        for _ in range(entries_per_user):
+            db.session.add(Entry(
+                user_id=user.id,
+                date=today - timedelta(days=random.randint(0, 3 * 365)),
+                hours=round(random.uniform(1, 10), 1),
+                revenue=round(random.uniform(0, 800), 2),
+                worker=random.choice(workers + [None])
+            ))
+    db.session.commit()
+    rollup.rebuild()
+    db.session.execute(text('ANALYZE'))
+    db.session.commit()
+
+
+def collect_statements():
+    """Run every route and return the distinct SELECTs issued (statement -> parameters) and the request count"""
+    statements = {}
+
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        if statement.lstrip().upper().startswith('SELECT') and statement not in statements:
+            statements[statement] = parameters
+
+    client = app.test_client()
+    client.post('/login', data={'username': 'plancheck', 'password': 'plancheck'})
+
+    # Deep pages of the entries listing, addressed by keyset cursor
+    user = User.query.filter_by(username='plancheck').first()
+    deep_entry = Entry.query.filter_by(user_id=user.id).order_by(Entry.date, Entry.id).offset(50).first()
+    routes = ROUTES + [
+        f'/entries?after={encode_cursor(deep_entry)}',
+        f'/entries?before={encode_cursor(deep_entry)}&worker=1',
+    ]
+
+    event.listen(db.engine, 'before_cursor_execute', before_cursor_execute)
+    try:
+        for route in routes:
+            response = client.get(route)
+            response.close()  # finishes streamed responses inside this loop
+            if response.status_code != 200:
+                raise RuntimeError(f"{route} returned {response.status_code}")
+    finally:
+        event.remove(db.engine, 'before_cursor_execute', before_cursor_execute)
+    return statements, len(routes)
+
+
+def full_scans(plan_rows):
+    """Return plan lines that scan a whole table without an index"""
+    scans = []
+    for row in plan_rows:
+        detail = row[-1]
+        if detail.startswith('SCAN ') and 'USING' not in detail and 'CONSTANT ROW' not in detail \
+                and not detail.startswith('SCAN (subquery'):
+            scans.append(detail)
+    return scans
+
+
+def check_query_plans():
+    """Return True when no query issued by the checked routes does a full table scan"""
+    with app.app_context():
+        seed()
+        statements, request_count = collect_statements()
+
+        failures = 0
+        raw = db.engine.raw_connection()
+        try:
+            cursor = raw.cursor()
+            for statement, parameters in statements.items():
+                cursor.execute(f"EXPLAIN QUERY PLAN {statement}", parameters)
+                scans = full_scans(cursor.fetchall())
+                if scans:
+                    failures += 1
+                    print(f"✗ Full table scan ({', '.join(scans)}):")
+                    print(f"    {' '.join(statement.split())}")
+        finally:
+            raw.close()
+
+        print(f"Checked {len(statements)} distinct queries from {request_count} requests.")
+        if failures:
+            print(f"✗ {failures} queries fall back to a full table scan.")
+            return False
+        print("✓ Every query is served by an index.")
+        return True
+
+
+if __name__ == '__main__':
+    try:
+        success = check_query_plans()
+    finally:
+        os.unlink(_db_file.name)
+    sys.exit(0 if success else 1)
@@ -0,0 +1,126 @@
+#!/usr/bin/env python3
+"""
+Rollup consistency check under concurrent writes
+Seeds a throwaway database, then runs many threads that add entries (form
+and batch API) and delete entries on the same user, worker and day at once.
+Some entries are deleted by two writers at once (a double-clicked Delete
+link) and some are edited by several writers at once (form and batch API).
+Afterwards the daily_totals rollup must equal what a rebuild would write;
+exits non-zero if any rollup row drifted.
+Run this script: python3 check_rollup_concurrency.py
+Against the legacy journal: SQLITE_JOURNAL_MODE=DELETE python3 check_rollup_concurrency.py
+"""
+import os
+import shutil
+import sys
+import tempfile
+import threading
+from datetime import date
+
+# Point the app at a scratch database before importing it
+_db_dir = tempfile.mkdtemp(prefix='rollup-check-')
+os.environ['DATABASE_URL'] = f'sqlite:///{os.path.join(_db_dir, "check.db")}'
+os.environ['SLOW_QUERY_LOG'] = os.path.join(_db_dir, 'slow_queries.log')
+os.environ.setdefault('SQLITE_JOURNAL_MODE', 'WAL')
+
+from app import app
+from models import db, User, Entry, Settings, Worker
+import rollup
+
+THREADS = 8
+OPERATIONS = 400  # Half deletes of seeded entries, half adds
+DOUBLE_DELETES = 40  # Seeded entries deleted by two writers each
+EDITED_ENTRIES = 5
+EDITS = 60  # Form and batch edits spread over the EDITED_ENTRIES
+DAY = date.today()
+
+
+def seed():
+    """One user and worker with the entries on DAY that the writers delete and edit"""
+    db.create_all()
+    user = User(username='rollupcheck')
+    user.set_password('rollupcheck')
+    db.session.add(user)
+    db.session.flush()
+    db.session.add(Settings(user_id=user.id))
+    worker = Worker(name='Alice', user_id=user.id, is_default=True)
+    db.session.add(worker)
+    db.session.flush()
+    for _ in range(OPERATIONS // 2 + DOUBLE_DELETES + EDITED_ENTRIES):
+        db.session.add(Entry(user_id=user.id, worker_id=worker.id, date=DAY, hours=1.5, revenue=100.0))
+    db.session.commit()
+    rollup.rebuild()
+    return worker.id, [entry.id for entry in Entry.query.filter_by(user_id=user.id).order_by(Entry.id)]
+
+
+def run_writers(worker_id, entry_ids):
+    """Run the adds, deletes and edits from THREADS logged-in clients; returns failed responses"""
+    single, double = entry_ids[:OPERATIONS // 2], entry_ids[OPERATIONS // 2:OPERATIONS // 2 + DOUBLE_DELETES]
+    edited = entry_ids[OPERATIONS // 2 + DOUBLE_DELETES:]
+    operations = [('delete', entry_id) for entry_id in single]
+    operations += [('batch' if n % 2 else 'form', None) for n in range(OPERATIONS - len(single))]
+    # Consecutive operations go to different threads, so each pair races
+    for entry_id in double:
+        operations += [('delete-again', entry_id), ('delete-again', entry_id)]
+    operations += [('batch-edit' if n % 2 else 'form-edit', edited[n % len(edited)]) for n in range(EDITS)]
+    failures = []
+
+    def writer(share):
+        client = app.test_client()
+        client.post('/login', data={'username': 'rollupcheck', 'password': 'rollupcheck'})
+        for kind, entry_id in share:
+            if kind in ('delete', 'delete-again'):
+                response = client.get(f'/delete_entry/{entry_id}')
+            elif kind == 'form-edit':
+                response = client.post(f'/add_entry?id={entry_id}', data={'date': DAY.isoformat(), 'hours': '3',
+                                                                           'revenue': str(entry_id % 7 * 10)})
+            elif kind == 'batch-edit':
+                response = client.post('/api/entries/batch', json={'operations': [{
+                    'op': 'update', 'id': entry_id, 'hours': 0.5, 'revenue': 25, 'worker_id': worker_id}]})
+            elif kind == 'form':
+                response = client.post('/add_entry', data={'date': DAY.isoformat(), 'hours': '2',
+                                                           'revenue': '50', 'worker_id': str(worker_id)})
+            else:
+                response = client.post('/api/entries/batch', json={'operations': [{
+                    'op': 'create', 'date': DAY.isoformat(), 'hours': 2, 'revenue': 50, 'worker_id': worker_id}]})
+            if response.status_code not in (200, 302):
+                failures.append((kind, response.status_code))
+            with client.session_transaction() as session:
+                flashes = session.pop('_flashes', [])
+            failures.extend((kind, message) for category, message in flashes if category == 'error'
+                            and not (kind == 'delete-again' and message == 'Entry not found.'))
+
+    threads = [threading.Thread(target=writer, args=(operations[n::THREADS],)) for n in range(THREADS)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return failures
+
+
+def check_rollup_concurrency():
+    """Return True when the rollup matches a rebuild after concurrent writes"""
+    with app.app_context():
+        worker_id, entry_ids = seed()
+    failures = run_writers(worker_id, entry_ids)
+    with app.app_context():
+        entries = Entry.query.count()
+        drift = rollup.find_drift()
+    print(f"{OPERATIONS + 2 * DOUBLE_DELETES + EDITS} concurrent writes from {THREADS} threads "
+          f"({app.config['SQLITE_PRAGMAS']['journal_mode']} journal): {entries} entries left")
+    for kind, detail in failures:
+        print(f"✗ {kind} failed: {detail}")
+    for key, stored, expected in drift:
+        print(f"✗ Rollup row {key}: stored {stored}, entries say {expected}")
+    if failures or drift:
+        return False
+    print("✓ Rollup matches a rebuild.")
+    return True
+
+
+if __name__ == '__main__':
+    try:
+        ok = check_rollup_concurrency()
+    finally:
+        shutil.rmtree(_db_dir, ignore_errors=True)
+    sys.exit(0 if ok else 1)
@@ -14,17 +14,80 @@ class Config:
     SESSION_COOKIE_HTTPONLY = True
     SESSION_COOKIE_SAMESITE = 'Lax'
     PERMANENT_SESSION_LIFETIME = 86400  # 24 hours
+    
+    # Maximum number of computed dashboard/chart results kept in memory
+    RESULT_CACHE_SIZE = int(os.environ.get('RESULT_CACHE_SIZE', 256))
+    
+    # Logged-in user identities kept in memory, and how long (seconds) each may be reused
+    USER_CACHE_SIZE = int(os.environ.get('USER_CACHE_SIZE', 256))
+    USER_CACHE_TTL = int(os.environ.get('USER_CACHE_TTL', 300))
+    
+    # Production WSGI server (gunicorn.conf.py). In-process caches are per worker, so the
+    # default is one process with several threads; more workers trade memory and cache
+    # hit rate for CPU parallelism.
+    WEB_BIND = os.environ.get('WEB_BIND', '0.0.0.0:5050')
+    WEB_WORKERS = int(os.environ.get('WEB_WORKERS', 1))
+    WEB_THREADS = int(os.environ.get('WEB_THREADS', 8))
+    WEB_TIMEOUT = int(os.environ.get('WEB_TIMEOUT', 60))  # Seconds before a stuck worker is restarted
+    WEB_GRACEFUL_TIMEOUT = int(os.environ.get('WEB_GRACEFUL_TIMEOUT', 30))  # Seconds to finish requests on restart
+    WEB_KEEPALIVE = int(os.environ.get('WEB_KEEPALIVE', 5))  # Seconds to hold idle keep-alive connections
+    
+    # PRAGMAs run on every new SQLite connection (see sqlite_tuning.py). WAL lets readers
+    # carry on while a write commits, synchronous=NORMAL skips the per-commit fsync that
+    # is slow on an SD card (still crash-safe in WAL mode), and busy_timeout makes a
+    # writer wait for the lock instead of failing with "database is locked".
+    SQLITE_PRAGMAS = {
+        'busy_timeout': int(os.environ.get('SQLITE_BUSY_TIMEOUT', 5000)),  # milliseconds
+        'journal_mode': os.environ.get('SQLITE_JOURNAL_MODE', 'WAL'),
+        'synchronous': os.environ.get('SQLITE_SYNCHRONOUS', 'NORMAL'),
+        'cache_size': int(os.environ.get('SQLITE_CACHE_SIZE', -16000)),  # negative = KiB, i.e. 16 MB
+        'mmap_size': int(os.environ.get('SQLITE_MMAP_SIZE', 64 * 1024 * 1024)),  # bytes
+        'temp_store': os.environ.get('SQLITE_TEMP_STORE', 'MEMORY'),
+    }
+    
+    # Connection pool per worker process: one connection per thread, a little overflow
+    # for streamed responses, and a bounded wait instead of queueing forever
+    SQLALCHEMY_ENGINE_OPTIONS = {} if ':memory:' in SQLALCHEMY_DATABASE_URI else {
+        'pool_size': int(os.environ.get('DB_POOL_SIZE', WEB_THREADS)),
+        'max_overflow': int(os.environ.get('DB_MAX_OVERFLOW', 4)),
+        'pool_timeout': int(os.environ.get('DB_POOL_TIMEOUT', 10)),
+    }
+    
+    # Per-request timing and SQL counts served at /metrics (metrics.py). Without METRICS_TOKEN
+    # only loopback clients may read it; with it, scrapers send "Authorization: Bearer <token>".
+    METRICS_ENABLED = os.environ.get('METRICS_ENABLED', '1') == '1'
+    METRICS_TOKEN = os.environ.get('METRICS_TOKEN')
+    
+    # Statements slower than this many milliseconds are logged with their query plan to a
+    # rotating file (slow_queries.py). 0 turns the log off.
+    SLOW_QUERY_THRESHOLD_MS = float(os.environ.get('SLOW_QUERY_THRESHOLD_MS', 100))
+    SLOW_QUERY_LOG = os.environ.get('SLOW_QUERY_LOG') or str(basedir / 'logs' / 'slow_queries.log')
+    SLOW_QUERY_LOG_MAX_BYTES = int(os.environ.get('SLOW_QUERY_LOG_MAX_BYTES', 1024 * 1024))
+    SLOW_QUERY_LOG_BACKUPS = int(os.environ.get('SLOW_QUERY_LOG_BACKUPS', 3))
+    
+    # Users who may profile a request with ?_profile=1 and see the profiles at /admin/profiles
+    # (profiler.py). Comma-separated usernames; nobody by default.
+    ADMIN_USERNAMES = frozenset(name.strip() for name in os.environ.get('ADMIN_USERNAMES', '').split(',') if name.strip())
+    PROFILE_DIR = os.environ.get('PROFILE_DIR') or str(basedir / 'logs' / 'profiles')
+    PROFILE_KEEP = int(os.environ.get('PROFILE_KEEP', 50))
+    
+    # How long batch API responses are kept for replay under their Idempotency-Key
+    IDEMPOTENCY_KEY_TTL_HOURS = int(os.environ.get('IDEMPOTENCY_KEY_TTL_HOURS', 48))
 
 
 class DevelopmentConfig(Config):
     """Development configuration"""
     DEBUG = True
+    USE_WSGI_SERVER = False  # python app.py runs the Werkzeug dev server
+    # Keep the dev database file self-contained (no -wal/-shm side files) unless asked otherwise
+    SQLITE_PRAGMAS = dict(Config.SQLITE_PRAGMAS, journal_mode=os.environ.get('SQLITE_JOURNAL_MODE', 'DELETE'))
 
 
 class ProductionConfig(Config):
     """Production configuration"""
     DEBUG = False
     SESSION_COOKIE_SECURE = True  # Requires HTTPS
+    USE_WSGI_SERVER = True  # python app.py hands over to gunicorn (gunicorn.conf.py)
     # In production, load SECRET_KEY from environment or instance/config.json
 
 
@@ -76,6 +76,12 @@ else
     echo "Warning: Service may not be running. Check status with: sudo systemctl status $SERVICE_NAME"
 fi
 
+# Run pending data backfills in the background; the app keeps serving meanwhile
+echo "Starting pending data backfills (log: $PROJECT_DIR/logs/backfills.log)..."
+mkdir -p "$PROJECT_DIR/logs"
+# Same configuration as the service (FLASK_ENV=production keeps the WAL journal)
+FLASK_ENV=production nohup flask --app app run-backfills >> "$PROJECT_DIR/logs/backfills.log" 2>&1 &
+
 echo "=========================================="
 echo "Deployment completed successfully!"
 echo "Time: $(date)"
@@ -0,0 +1,178 @@
+"""
+Batch writes of entries for the JSON API.
+
+A batch is a list of create/update/delete operations applied in a single
+transaction: either every operation succeeds or none does. Clients may send
+an Idempotency-Key header; the response of a successful batch is stored
+under that key and replayed on retries instead of applying it again.
+"""
+import hashlib
+import json
+from datetime import datetime, timedelta
+from models import db, Entry, Worker, IdempotencyKey
+from entry_io import validate_entry_values
+import rollup
+
+MAX_BATCH_OPERATIONS = 500
+MAX_IDEMPOTENCY_KEY_LENGTH = 100
+BATCH_OPERATIONS = ('create', 'update', 'delete')
+
+
+class BatchError(Exception):
+    """A batch was rejected; errors is a list of {'index', 'error'} dicts"""
+
+    def __init__(self, errors):
+        super().__init__(f'{len(errors)} invalid operation(s)')
+        self.errors = errors
+
+
+def request_hash(raw_body):
+    """Fingerprint of a request body, used to detect a key reused for a different batch"""
+    return hashlib.sha256(raw_body).hexdigest()
+
+
+def find_idempotent_response(user_id, key, ttl_hours):
+    """Stored response for a user's idempotency key, or None (also once the key is older than ttl_hours)"""
+    cutoff = datetime.utcnow() - timedelta(hours=ttl_hours)
+    return IdempotencyKey.query.filter(
+        IdempotencyKey.user_id == user_id,
+        IdempotencyKey.key == key,
+        IdempotencyKey.created_at >= cutoff
+    ).first()
+
+
+def store_idempotent_response(user_id, key, raw_hash, status_code, body, ttl_hours):
+    """Record a batch response under its key (committed with the batch) and prune expired keys"""
+    cutoff = datetime.utcnow() - timedelta(hours=ttl_hours)
+    IdempotencyKey.query.filter(
+        IdempotencyKey.user_id == user_id,
+        IdempotencyKey.created_at < cutoff
+    ).delete(synchronize_session=False)
+    db.session.add(IdempotencyKey(
+        user_id=user_id,
+        key=key,
+        request_hash=raw_hash,
+        status_code=status_code,
+        response_body=json.dumps(body)
+    ))
+
+
+def _parse_values(op, current=None):
+    """Validated column values for a create (current=None) or an update of current"""
+    values = {}
+    if 'date' in op or current is None:
+        try:
+            values['date'] = datetime.strptime(str(op.get('date', '')), '%Y-%m-%d').date()
+        except ValueError:
+            raise ValueError('date must be in YYYY-MM-DD format.')
+    for field in ('hours', 'revenue'):
+        if field in op or current is None:
+            value = op.get(field)
+            if isinstance(value, bool) or not isinstance(value, (int, float)):
+                raise ValueError(f'{field} must be a number.')
+            values[field] = float(value)
+    if 'worker_id' in op:
+        if op['worker_id'] is not None and (isinstance(op['worker_id'], bool) or not isinstance(op['worker_id'], int)):
+            raise ValueError('worker_id must be an integer or null.')
+        values['worker_id'] = op['worker_id']
+    if 'notes' in op or current is None:
+        values['notes'] = str(op.get('notes') or '').strip()
+
+    error = validate_entry_values(
+        values.get('hours', current.hours if current else 0),
+        values.get('revenue', current.revenue if current else 0)
+    )
+    if error:
+        raise ValueError(error)
+    return values
+
+
+def _add_delta(deltas, worker_id, day, revenue, hours, count):
+    delta = deltas.setdefault((worker_id, day), [0.0, 0.0, 0])
+    delta[0] += revenue
+    delta[1] += hours
+    delta[2] += count
+
+
+def apply_entry_batch(user_id, operations):
+    """Apply a list of entry operations in the current transaction (the caller commits).
+
+    Each operation is a dict with op = create, update or delete. create takes
+    date, hours, revenue and optional worker_id and notes; update takes id plus
+    any of those fields; delete takes id.
+
+    Returns:
+        List of {'index', 'op', 'id'} results, in operation order
+
+    Raises:
+        BatchError: if any operation is invalid; the caller rolls back the session
+    """
+    if not isinstance(operations, list) or not operations:
+        raise BatchError([{'index': None, 'error': 'operations must be a non-empty list.'}])
+    if len(operations) > MAX_BATCH_OPERATIONS:
+        raise BatchError([{'index': None, 'error': f'At most {MAX_BATCH_OPERATIONS} operations per batch.'}])
+
+    # Load every entry and worker the batch refers to up front; entries under the
+    # write lock, so their rollup deltas match what is stored
+    entry_ids = {
+        op['id'] for op in operations
+        if isinstance(op, dict) and op.get('op') in ('update', 'delete') and isinstance(op.get('id'), int)
+    }
+    entries_by_id = rollup.lock_entries(user_id, entry_ids)
+    worker_ids = {w.id for w in Worker.query.filter_by(user_id=user_id)}
+
+    errors = []
+    results = []
+    created = []
+    deltas = {}
+    seen_ids = set()
+    for index, op in enumerate(operations):
+        try:
+            if not isinstance(op, dict) or op.get('op') not in BATCH_OPERATIONS:
+                raise ValueError(f'op must be one of {", ".join(BATCH_OPERATIONS)}.')
+            action = op['op']
+
+            entry = None
+            if action in ('update', 'delete'):
+                entry = entries_by_id.get(op.get('id')) if isinstance(op.get('id'), int) else None
+                if entry is None:
+                    raise ValueError(f'Entry {op.get("id")} not found.')
+                if entry.id in seen_ids:
+                    raise ValueError(f'Entry {entry.id} appears more than once in the batch.')
+                seen_ids.add(entry.id)
+
+            if action == 'delete':
+                _add_delta(deltas, entry.worker_id, entry.date, -entry.revenue, -entry.hours, -1)
+                db.session.delete(entry)
+                results.append({'index': index, 'op': action, 'id': entry.id})
+                continue
+
+            values = _parse_values(op, current=entry)
+            if values.get('worker_id') is not None and values['worker_id'] not in worker_ids:
+                raise ValueError(f'Worker {values["worker_id"]} not found.')
+
+            if action == 'create':
+                entry = Entry(user_id=user_id, **values)
+                db.session.add(entry)
+                created.append((index, entry))
+            else:
+                _add_delta(deltas, entry.worker_id, entry.date, -entry.revenue, -entry.hours, -1)
+                for field, value in values.items():
+                    setattr(entry, field, value)
+                if 'worker_id' in values:
+                    entry.worker_name = None  # Legacy name; the worker_id backfill must not relink it
+                entry.updated_at = datetime.utcnow()
+            _add_delta(deltas, entry.worker_id, entry.date, entry.revenue, entry.hours, 1)
+            results.append({'index': index, 'op': action, 'id': entry.id})
+        except ValueError as e:
+            errors.append({'index': index, 'error': str(e)})
+
+    if errors:
+        raise BatchError(errors)
+
+    # New entries get their ids on flush
+    db.session.flush()
+    for index, entry in created:
+        results[index]['id'] = entry.id
+    rollup.apply_deltas(user_id, deltas)
+    return results
@@ -0,0 +1,207 @@
+"""
+Bulk import and export of entries.
+
+Uploads are parsed row by row from the incoming stream and written in
+batched transactions, and exports are generated from a cursor fetched in
+batches, so memory use is bounded by the batch size rather than the size
+of the file.
+"""
+import csv
+import io
+import json
+from datetime import datetime
+from sqlalchemy import func, insert, select
+from models import db, Entry, Worker
+import rollup
+
+IMPORT_BATCH_SIZE = 1000
+IMPORT_COLUMNS = ('date', 'hours', 'revenue', 'worker', 'notes')
+MAX_REPORTED_ERRORS = 500
+EXPORT_FETCH_SIZE = 1000
+EXPORT_FORMATS = {
+    'csv': 'text/csv',
+    'ndjson': 'application/x-ndjson'
+}
+
+
+def validate_entry_values(hours, revenue):
+    """Return an error message for invalid entry amounts, or None if they are acceptable"""
+    if hours <= 0:
+        return 'Hours must be greater than 0.'
+    if revenue < 0:
+        return 'Revenue cannot be negative.'
+    return None
+
+
+class ImportReport:
+    """Outcome of a bulk import: counts plus per-row errors (line number, message)"""
+
+    def __init__(self):
+        self.imported = 0
+        self.skipped = 0
+        self.workers_created = []
+        self.errors = []
+
+    def add_error(self, line, message):
+        self.skipped += 1
+        if len(self.errors) < MAX_REPORTED_ERRORS:
+            self.errors.append((line, message))
+
+
+def _parse_row(row):
+    """Convert one CSV row into Entry column values, raising ValueError with a readable message"""
+    raw_date = (row.get('date') or '').strip()
+    try:
+        entry_date = datetime.strptime(raw_date, '%Y-%m-%d').date()
+    except ValueError:
+        raise ValueError(f'Invalid date "{raw_date}" (expected YYYY-MM-DD).')
+    try:
+        hours = float(row.get('hours') or 0)
+        revenue = float(row.get('revenue') or 0)
+    except ValueError as e:
+        raise ValueError(f'Invalid number: {e}')
+    error = validate_entry_values(hours, revenue)
+    if error:
+        raise ValueError(error)
+    return {
+        'date': entry_date,
+        'hours': hours,
+        'revenue': revenue,
+        'worker': (row.get('worker') or '').strip(),
+        'notes': (row.get('notes') or '').strip()
+    }
+
+
+def _resolve_workers(user_id, names, workers_by_name, report):
+    """Make sure every name has a worker id, creating missing workers in one flush"""
+    missing = sorted(name for name in names if name and name not in workers_by_name)
+    if not missing:
+        return
+    new_workers = [Worker(name=name, user_id=user_id) for name in missing]
+    db.session.add_all(new_workers)
+    db.session.flush()
+    for worker in new_workers:
+        workers_by_name[worker.name] = worker.id
+    report.workers_created.extend(missing)
+
+
+def _write_batch(user_id, batch, workers_by_name, report):
+    """Insert one batch of parsed rows and their rollup deltas in a single transaction"""
+    _resolve_workers(user_id, {row['worker'] for row in batch}, workers_by_name, report)
+    now = datetime.utcnow()
+    values = []
+    deltas = {}
+    for row in batch:
+        worker_id = workers_by_name.get(row['worker']) if row['worker'] else None
+        values.append({
+            'user_id': user_id,
+            'date': row['date'],
+            'hours': row['hours'],
+            'revenue': row['revenue'],
+            'worker_id': worker_id,
+            'notes': row['notes'],
+            'created_at': now,
+            'updated_at': now
+        })
+        delta = deltas.setdefault((worker_id, row['date']), [0.0, 0.0, 0])
+        delta[0] += row['revenue']
+        delta[1] += row['hours']
+        delta[2] += 1
+    db.session.execute(insert(Entry.__table__), values)
+    rollup.apply_deltas(user_id, deltas)
+    db.session.commit()
+    report.imported += len(batch)
+
+
+def import_entries_csv(text_stream, user_id, batch_size=IMPORT_BATCH_SIZE):
+    """Import entries for a user from a CSV text stream.
+
+    The header row must name at least date, hours and revenue; worker and
+    notes are optional. Unknown worker names are created. Invalid rows are
+    skipped and reported; valid rows are committed every batch_size rows.
+
+    Returns:
+        ImportReport
+    """
+    report = ImportReport()
+    reader = csv.DictReader(text_stream)
+    if reader.fieldnames is None:
+        report.add_error(1, 'The file is empty.')
+        return report
+    reader.fieldnames = [(name or '').strip().lower() for name in reader.fieldnames]
+    missing = [column for column in ('date', 'hours', 'revenue') if column not in reader.fieldnames]
+    if missing:
+        report.add_error(1, f'Missing required column(s): {", ".join(missing)}.')
+        return report
+
+    workers_by_name = {w.name: w.id for w in Worker.query.filter_by(user_id=user_id)}
+    batch = []
+    for row in reader:
+        try:
+            batch.append(_parse_row(row))
+        except ValueError as e:
+            report.add_error(reader.line_num, str(e))
+            continue
+        if len(batch) >= batch_size:
+            _write_batch(user_id, batch, workers_by_name, report)
+            batch = []
+    if batch:
+        _write_batch(user_id, batch, workers_by_name, report)
+    return report
+
+
+def iter_export_rows(user_id, worker_filter='all', start_date=None, end_date=None,
+                     fetch_size=EXPORT_FETCH_SIZE):
+    """Yield a user's entries oldest first as dicts keyed by IMPORT_COLUMNS.
+
+    Rows are fetched from the database fetch_size at a time, never all at once.
+    """
+    query = select(
+        Entry.date, Entry.hours, Entry.revenue,
+        # Legacy name for entries the worker_id backfill has not reached yet
+        func.coalesce(Worker.name, Entry.worker_name).label('worker'), Entry.notes
+    ).outerjoin(Worker, Entry.worker_id == Worker.id).where(Entry.user_id == user_id)
+    if worker_filter != 'all':
+        query = query.where(Entry.worker_id == worker_filter)
+    if start_date:
+        query = query.where(Entry.date >= start_date)
+    if end_date:
+        query = query.where(Entry.date <= end_date)
+    query = query.order_by(Entry.date, Entry.id).execution_options(yield_per=fetch_size)
+
+    for row in db.session.execute(query):
+        yield {
+            'date': row.date.isoformat(),
+            'hours': row.hours,
+            'revenue': row.revenue,
+            'worker': row.worker or '',
+            'notes': row.notes or ''
+        }
+
+
+def serialize_entries(rows, fmt='csv', chunk_rows=EXPORT_FETCH_SIZE):
+    """Serialize export rows as CSV (same columns the importer reads) or NDJSON.
+
+    Yields text chunks of up to chunk_rows rows, suitable for a streamed response.
+    """
+    buffer = io.StringIO()
+    if fmt == 'csv':
+        writer = csv.DictWriter(buffer, fieldnames=IMPORT_COLUMNS)
+        writer.writeheader()
+        write = writer.writerow
+    else:
+        def write(row):
+            buffer.write(json.dumps(row))
+            buffer.write('\n')
+
+    pending = 0
+    for row in rows:
+        write(row)
+        pending += 1
+        if pending >= chunk_rows:
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+            pending = 0
+    if buffer.tell():
+        yield buffer.getvalue()
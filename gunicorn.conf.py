@@ -0,0 +1,40 @@
+"""
+Gunicorn settings for production
+All values come from config.py (and so from WEB_* environment variables).
+Run: gunicorn --config gunicorn.conf.py
+"""
+import sys
+from pathlib import Path
+
+# Make the project importable however gunicorn was started
+sys.path.insert(0, str(Path(__file__).parent))
+
+from config import get_config
+
+_config = get_config()
+
+wsgi_app = 'wsgi:application'
+bind = _config.WEB_BIND
+
+# Threads share one process's caches; each worker process has its own
+worker_class = 'gthread'
+workers = _config.WEB_WORKERS
+threads = _config.WEB_THREADS
+
+# Import the app (and run database setup) once in the master, before forking
+preload_app = True
+
+timeout = _config.WEB_TIMEOUT
+graceful_timeout = _config.WEB_GRACEFUL_TIMEOUT
+keepalive = _config.WEB_KEEPALIVE
+
+accesslog = '-'
+errorlog = '-'
+
+
+def post_fork(server, worker):
+    """Drop database connections inherited from the master; each worker opens its own"""
+    from app import app
+    from models import db
+    with app.app_context():
+        db.engine.dispose(close=False)
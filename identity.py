@@ -0,0 +1,67 @@
+"""
+Cached user identities for Flask-Login.
+
+Authenticated requests need little more than the user's id, so the user
+loader returns a small detached UserIdentity instead of a User row and keeps
+it in a bounded, TTL-limited cache, sized from USER_CACHE_SIZE and
+USER_CACHE_TTL in app.config when it is first used. Any ORM update or delete of a User
+(password change, rename, removal) drops that user's cached identity; the
+TTL bounds how long other processes may keep serving an old one.
+"""
+import threading
+from flask import current_app
+from flask_login import UserMixin
+from sqlalchemy import event
+from models import User
+from cache import LRUCache
+
+user_cache = None  # Created by get_user_cache()
+_user_cache_lock = threading.Lock()
+
+
+class UserIdentity(UserMixin):
+    """The parts of a User that authenticated requests use, safe to share across requests"""
+
+    def __init__(self, user):
+        self.id = user.id
+        self.username = user.username
+
+    def __repr__(self):
+        return f'<UserIdentity {self.username}>'
+
+
+def get_user_cache():
+    """The identity cache, created on first use (inside an app context) from app.config"""
+    global user_cache
+    if user_cache is None:
+        with _user_cache_lock:
+            if user_cache is None:
+                user_cache = LRUCache(current_app.config['USER_CACHE_SIZE'],
+                                      ttl=current_app.config['USER_CACHE_TTL'])
+    return user_cache
+
+
+def load_identity(user_id):
+    """Identity for a user id from the cache, else the database (None if the user is gone)"""
+    cache = get_user_cache()
+    key = (user_id, 'identity')
+    identity = cache.get(key)
+    if identity is None:
+        user = User.query.get(user_id)
+        if user is None:
+            return None
+        identity = UserIdentity(user)
+        cache.set(key, identity)
+    return identity
+
+
+def invalidate_identity(user_id):
+    """Drop a user's cached identity"""
+    if user_cache is not None:
+        user_cache.invalidate_user(user_id)
+
+
+@event.listens_for(User, 'after_update')
+@event.listens_for(User, 'after_delete')
+def _user_changed(mapper, connection, target):
+    invalidate_identity(target.id)
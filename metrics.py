@@ -0,0 +1,170 @@
+"""
+Per-request performance metrics in Prometheus text format.
+
+Every request records its wall time plus the SQL it ran: statement count,
+time spent in each statement, executing and fetching its rows (sql_timing.py),
+and rows fetched. The numbers are aggregated per endpoint into histograms and
+counters, and /metrics renders them in the Prometheus text exposition format.
+
+Metrics live in process memory, so each gunicorn worker reports its own.
+Streamed responses (the entries export) are timed up to the start of the
+body, not until the last chunk is sent.
+"""
+import threading
+import time
+from flask import g, has_app_context, request
+from sql_timing import on_statement
+
+# Histogram bucket upper bounds
+REQUEST_SECONDS_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+QUERY_SECONDS_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 1.0)
+QUERIES_PER_REQUEST_BUCKETS = (0, 1, 2, 5, 10, 20, 50, 100)
+
+
+class Histogram:
+    """Cumulative bucket counts, sum and count per label set"""
+
+    def __init__(self, name, help_text, label_names, buckets):
+        self.name = name
+        self.help_text = help_text
+        self.label_names = label_names
+        self.buckets = buckets
+        self.series = {}
+
+    def observe(self, labels, value):
+        series = self.series.get(labels)
+        if series is None:
+            series = self.series[labels] = [[0] * len(self.buckets), 0.0, 0]
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                series[0][i] += 1
+        series[1] += value
+        series[2] += 1
+
+    def render(self):
+        lines = [f'# HELP {self.name} {self.help_text}', f'# TYPE {self.name} histogram']
+        for labels, (bucket_counts, total, count) in sorted(self.series.items()):
+            label_text = _label_text(self.label_names, labels)
+            for bound, bucket_count in zip(self.buckets, bucket_counts):
+                lines.append(f'{self.name}_bucket{{{label_text},le="{bound}"}} {bucket_count}')
+            lines.append(f'{self.name}_bucket{{{label_text},le="+Inf"}} {count}')
+            lines.append(f'{self.name}_sum{{{label_text}}} {total:.6f}')
+            lines.append(f'{self.name}_count{{{label_text}}} {count}')
+        return lines
+
+
+class Counter:
+    """Monotonic totals per label set"""
+
+    def __init__(self, name, help_text, label_names):
+        self.name = name
+        self.help_text = help_text
+        self.label_names = label_names
+        self.series = {}
+
+    def inc(self, labels, amount=1):
+        self.series[labels] = self.series.get(labels, 0) + amount
+
+    def render(self):
+        lines = [f'# HELP {self.name} {self.help_text}', f'# TYPE {self.name} counter']
+        for labels, value in sorted(self.series.items()):
+            lines.append(f'{self.name}{{{_label_text(self.label_names, labels)}}} {value}')
+        return lines
+
+
+def _label_text(names, values):
+    escaped = (str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n') for value in values)
+    return ','.join(f'{name}="{value}"' for name, value in zip(names, escaped))
+
+
+_lock = threading.Lock()
+_started = time.time()
+requests_total = Counter('http_requests_total', 'Requests handled, by endpoint, method and status',
+                         ('endpoint', 'method', 'status'))
+request_seconds = Histogram('http_request_duration_seconds', 'Wall time of requests, by endpoint',
+                            ('endpoint',), REQUEST_SECONDS_BUCKETS)
+queries_per_request = Histogram('db_queries_per_request', 'SQL statements executed per request, by endpoint',
+                                ('endpoint',), QUERIES_PER_REQUEST_BUCKETS)
+query_seconds = Histogram('db_query_duration_seconds', 'Time of single SQL statements, by endpoint',
+                          ('endpoint',), QUERY_SECONDS_BUCKETS)
+request_sql_seconds = Histogram('db_request_sql_seconds', 'Total SQL time per request, by endpoint',
+                                ('endpoint',), REQUEST_SECONDS_BUCKETS)
+rows_fetched_total = Counter('db_rows_fetched_total', 'Rows returned to the app by SQL statements, by endpoint',
+                             ('endpoint',))
+METRICS = (requests_total, request_seconds, queries_per_request, query_seconds, request_sql_seconds,
+           rows_fetched_total)
+
+
+class RequestMetrics:
+    """What one request has spent so far, kept on flask.g"""
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.query_times = []
+        self.rows = 0
+        self.recorded = False
+
+
+def _current():
+    return g.get('request_metrics') if has_app_context() else None
+
+
+def _record(metrics, status):
+    """Fold a finished request into the aggregates"""
+    if metrics.recorded:
+        return
+    metrics.recorded = True
+    endpoint = request.endpoint or 'unmatched'
+    elapsed = time.perf_counter() - metrics.started
+    with _lock:
+        requests_total.inc((endpoint, request.method, str(status)))
+        request_seconds.observe((endpoint,), elapsed)
+        queries_per_request.observe((endpoint,), len(metrics.query_times))
+        request_sql_seconds.observe((endpoint,), sum(metrics.query_times))
+        for seconds in metrics.query_times:
+            query_seconds.observe((endpoint,), seconds)
+        if metrics.rows:
+            rows_fetched_total.inc((endpoint,), metrics.rows)
+
+
+def render_metrics():
+    """All metrics of this process in Prometheus text exposition format"""
+    lines = ['# HELP process_start_time_seconds Start time of the process since the Unix epoch',
+             '# TYPE process_start_time_seconds gauge',
+             f'process_start_time_seconds {_started:.3f}']
+    with _lock:
+        for metric in METRICS:
+            lines.extend(metric.render())
+    return '\n'.join(lines) + '\n'
+
+
+def init_metrics(app, db):
+    """Time every request of the app and the SQL statements it runs on the app's engine"""
+    with app.app_context():
+        engine = db.engine
+
+    def _statement_finished(timing):
+        metrics = _current()
+        if metrics is not None:
+            metrics.query_times.append(timing.seconds)
+            metrics.rows += timing.rows
+
+    on_statement(engine, _statement_finished)
+
+    @app.before_request
+    def _start_request_metrics():
+        g.request_metrics = RequestMetrics()
+
+    @app.after_request
+    def _finish_request_metrics(response):
+        metrics = g.get('request_metrics')
+        if metrics is not None:
+            _record(metrics, response.status_code)
+        return response
+
+    @app.teardown_request
+    def _failed_request_metrics(exc):
+        # after_request does not run when a view raises
+        metrics = g.get('request_metrics')
+        if metrics is not None and not metrics.recorded:
+            _record(metrics, 500)
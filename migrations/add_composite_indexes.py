@@ -0,0 +1,68 @@
+"""
+Manual migration script to add composite indexes for the hot query paths
+Every dashboard, chart and entries query filters on user_id, then optionally
+worker, then a date range, which the single-column date index cannot serve. The
+worker is matched by worker_id; an older index on worker_name is replaced.
+Run this script: python3 migrations/add_composite_indexes.py
+"""
+import sys
+from pathlib import Path
+
+# Add parent directory to path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from app import app, db
+from sqlalchemy import text
+
+INDEXES = [
+    ('ix_entries_user_date', 'entries', 'user_id, date'),
+    ('ix_entries_user_worker_date', 'entries', 'user_id, worker_id, date'),
+    ('ix_daily_totals_user_date', 'daily_totals', 'user_id, date'),
+    ('ix_workers_user_name', 'workers', 'user_id, name'),
+    ('ix_entries_user_updated', 'entries', 'user_id, updated_at'),
+]
+
+
+def add_composite_indexes():
+    """Create the composite indexes if they don't exist yet"""
+    with app.app_context():
+        try:
+            # Make sure tables introduced alongside these indexes exist
+            db.create_all()
+            
+            conn = db.engine.connect()
+            
+            entry_columns = [row[1] for row in conn.execute(text("PRAGMA table_info(entries)"))]
+            # An earlier version of this index was on the legacy worker_name column
+            stale = [row[2] for row in conn.execute(text("PRAGMA index_info(ix_entries_user_worker_date)"))]
+            if 'worker_name' in stale:
+                conn.execute(text("DROP INDEX ix_entries_user_worker_date"))
+                conn.commit()
+                print("✓ Dropped ix_entries_user_worker_date on worker_name")
+            
+            for index_name, table_name, columns in INDEXES:
+                if table_name == 'entries' and 'worker_id' in columns and 'worker_id' not in entry_columns:
+                    print(f"Skipping {index_name}: run migrations/add_entry_worker_id.py first")
+                    continue
+                print(f"Creating index {index_name} on {table_name} ({columns})...")
+                conn.execute(text(f"CREATE INDEX IF NOT EXISTS {index_name} ON {table_name} ({columns})"))
+                conn.commit()
+                print(f"✓ Index {index_name} ready")
+            
+            # Refresh planner statistics so the new indexes get picked
+            conn.execute(text("ANALYZE"))
+            conn.commit()
+            
+            conn.close()
+            print("✓ Migration completed successfully!")
+            return True
+            
+        except Exception as e:
+            print(f"✗ Error adding composite indexes: {e}")
+            import traceback
+            traceback.print_exc()
+            return False
+
+if __name__ == '__main__':
+    success = add_composite_indexes()
+    sys.exit(0 if success else 1)
@@ -0,0 +1,173 @@
+"""
+Migration script to link entries to workers by id instead of by name
+In two parts. prepare_entry_worker_id() adds entries.worker_id, creates
+worker rows for legacy names that have none, re-keys the composite index and
+the daily_totals rollup on worker_id and registers the backfill; the app runs
+it at startup. backfill_entry_worker_id() then fills worker_id in resumable
+batches (backfill.py: one short transaction each, so the app keeps serving)
+from `flask --app app run-backfills`, outside the serving processes.
+Run this script: python3 migrations/add_entry_worker_id.py
+"""
+import sys
+from datetime import datetime
+from pathlib import Path
+
+# Add parent directory to path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from models import db, Entry
+from backfill import (run_backfill, register_backfill, is_backfill_unfinished, BACKFILL_BATCH_SIZE,
+                      BACKFILL_PAUSE_SECONDS)
+from sqlalchemy import DateTime, bindparam, delete, text
+
+
+def _columns(conn, table):
+    """Column names of a table ([] if it doesn't exist)"""
+    return [row[1] for row in conn.execute(text(f"PRAGMA table_info({table})"))]
+
+
+def _index_columns(conn, index):
+    """Column names of an index ([] if it doesn't exist)"""
+    return [row[2] for row in conn.execute(text(f"PRAGMA index_info({index})"))]
+
+
+def _link_worker_ids(conn, first_id, last_id):
+    """Point one batch of entries at the worker row matching their legacy name"""
+    changed = conn.execute(text("""
+        UPDATE entries SET worker_id = (
+            SELECT w.id FROM workers w
+            WHERE w.user_id = entries.user_id AND w.name = entries.worker_name
+            ORDER BY w.id LIMIT 1
+        )
+        WHERE id BETWEEN :first_id AND :last_id
+          AND worker_id IS NULL AND worker_name IS NOT NULL AND worker_name != ''
+    """), {'first_id': first_id, 'last_id': last_id}).rowcount
+    if changed:
+        # Entries moved to another worker: change their owners' data version (analytics.get_data_version)
+        conn.execute(text("""
+            UPDATE settings SET updated_at = :now
+            WHERE user_id IN (SELECT DISTINCT user_id FROM entries WHERE id BETWEEN :first_id AND :last_id)
+        """).bindparams(bindparam('now', type_=DateTime)),
+            {'now': datetime.utcnow(), 'first_id': first_id, 'last_id': last_id})
+    return changed
+
+
+WORKER_ID_BACKFILL = 'entries-worker-id'
+
+
+def needs_worker_id_column():
+    """True when entries has no worker_id yet or the rollup is still keyed by name"""
+    with db.engine.connect() as conn:
+        return 'worker_id' not in _columns(conn, 'entries') or 'worker_name' in _columns(conn, 'daily_totals')
+
+
+def worker_id_backfill_pending():
+    """True when the worker_id backfill was registered (or interrupted) and has not completed"""
+    with db.engine.connect() as conn:
+        return is_backfill_unfinished(conn, WORKER_ID_BACKFILL)
+
+
+def prepare_entry_worker_id():
+    """Schema part of the migration, quick enough for startup (must run inside an app context).
+
+    Adds the column, creates the workers the backfill will link entries to,
+    drops the name-keyed index and rollup (db.create_all() and the schema
+    upgrade recreate them on worker_id) and registers the backfill as
+    pending. Until backfill_entry_worker_id() has run, legacy entries have a
+    NULL worker_id and count as unassigned.
+
+    The workers are created here rather than by the backfill, so a worker
+    deleted while the backfill is pending is not brought back by it.
+    """
+    with db.engine.connect() as conn:
+        if 'worker_id' not in _columns(conn, 'entries'):
+            conn.execute(text("ALTER TABLE entries ADD COLUMN worker_id INTEGER REFERENCES workers(id)"))
+            print("✓ Column worker_id added")
+            has_legacy_names = conn.execute(text(
+                "SELECT 1 FROM entries WHERE worker_name IS NOT NULL AND worker_name != '' LIMIT 1"
+            )).first()
+            if has_legacy_names:
+                created = conn.execute(text("""
+                    INSERT INTO workers (name, user_id, is_default, created_at)
+                    SELECT DISTINCT e.worker_name, e.user_id, 0, CURRENT_TIMESTAMP
+                    FROM entries e
+                    WHERE e.worker_name IS NOT NULL AND e.worker_name != ''
+                      AND NOT EXISTS (
+                          SELECT 1 FROM workers w WHERE w.user_id = e.user_id AND w.name = e.worker_name
+                      )
+                """)).rowcount
+                if created:
+                    print(f"✓ Created {created} workers for names only found on entries")
+                register_backfill(conn, WORKER_ID_BACKFILL, 'entries')
+                print(f"Backfill {WORKER_ID_BACKFILL} is pending; run it with: flask --app app run-backfills")
+        # The composite index used to be on worker_name
+        if 'worker_name' in _index_columns(conn, 'ix_entries_user_worker_date'):
+            conn.execute(text("DROP INDEX ix_entries_user_worker_date"))
+        # The rollup is derived data; it is recreated keyed by worker_id
+        if 'worker_name' in _columns(conn, 'daily_totals'):
+            conn.execute(text("DROP TABLE daily_totals"))
+        conn.commit()
+    db.create_all()
+
+
+def backfill_entry_worker_id(batch_size=BACKFILL_BATCH_SIZE, pause=BACKFILL_PAUSE_SECONDS):
+    """Point legacy entries at worker rows, in resumable batches, while the app keeps serving.
+
+    Returns:
+        BackfillReport of the run (completed is False if it was interrupted)
+    """
+    import rollup
+
+    # Backfill in resumable batches so no single transaction holds the write lock for long
+    report = run_backfill(WORKER_ID_BACKFILL, 'entries', _link_worker_ids, batch_size=batch_size, pause=pause)
+    if report.completed:
+        # The batches moved entries between workers behind the rollup's back
+        # (rebuild() also changes every user's data version)
+        rows = rollup.rebuild()
+        print(f"✓ Daily totals rebuilt ({rows} rows)")
+    return report
+
+
+def delete_unlinked_entries(user_id, worker_name):
+    """Delete a user's legacy entries that carry worker_name but are not linked to a worker yet.
+
+    Used when that worker is deleted, so its entries go with it even while
+    the backfill is pending. Runs in the session; the caller commits.
+    """
+    import rollup
+
+    deleted = db.session.execute(
+        delete(Entry).where(Entry.user_id == user_id, Entry.worker_id.is_(None), Entry.worker_name == worker_name)
+        .returning(Entry.date, Entry.revenue, Entry.hours)
+    ).all()
+    deltas = {}
+    for day, revenue, hours in deleted:
+        delta = deltas.setdefault((None, day), [0.0, 0.0, 0])
+        delta[0] -= revenue
+        delta[1] -= hours
+        delta[2] -= 1
+    rollup.apply_deltas(user_id, deltas)
+    return len(deleted)
+
+
+def add_entry_worker_id(batch_size=BACKFILL_BATCH_SIZE):
+    """Whole migration in one go: schema, then the backfill (must run inside an app context)"""
+    prepare_entry_worker_id()
+    report = backfill_entry_worker_id(batch_size=batch_size)
+    if not report.completed:
+        raise RuntimeError('worker_id backfill did not finish')
+    return True
+
+
+if __name__ == '__main__':
+    from app import app
+    with app.app_context():
+        try:
+            success = add_entry_worker_id()
+            print("✓ Migration completed successfully!")
+        except Exception as e:
+            print(f"✗ Error migrating entries to worker_id: {e}")
+            import traceback
+            traceback.print_exc()
+            success = False
+    sys.exit(0 if success else 1)
@@ -34,24 +34,58 @@ class User(UserMixin, db.Model):
 class Entry(db.Model):
     """Work entry model for daily tracking"""
     __tablename__ = 'entries'
+    __table_args__ = (
+        # Every hot query filters on user, then optionally worker, then a date range
+        db.Index('ix_entries_user_date', 'user_id', 'date'),
+        db.Index('ix_entries_user_worker_date', 'user_id', 'worker_id', 'date'),
+        # Latest change per user, for the dashboard's conditional GET version
+        db.Index('ix_entries_user_updated', 'user_id', 'updated_at'),
+    )
     
     id = db.Column(db.Integer, primary_key=True)
     date = db.Column(db.Date, nullable=False, index=True)
     hours = db.Column(db.Float, nullable=False)
     revenue = db.Column(db.Float, nullable=False)
-    worker_name = db.Column(db.String(100), nullable=True)
+    worker_id = db.Column(db.Integer, db.ForeignKey('workers.id'), nullable=True, index=True)
+    worker_name = db.Column(db.String(100), nullable=True)  # Legacy free-text worker, superseded by worker_id
     notes = db.Column(db.Text, nullable=True)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
     user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False)
     
+    # Relationships
+    worker = db.relationship('Worker')
+    
     def __repr__(self):
         return f'<Entry {self.date} - ${self.revenue}>'
 
 
+class DailyTotal(db.Model):
+    """Per-day rollup of entries, kept in sync with every write to entries"""
+    __tablename__ = 'daily_totals'
+    __table_args__ = (
+        db.UniqueConstraint('user_id', 'worker_id', 'date', name='uq_daily_totals_user_worker_date'),
+        db.Index('ix_daily_totals_user_date', 'user_id', 'date'),
+    )
+    
+    id = db.Column(db.Integer, primary_key=True)
+    user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False)
+    worker_id = db.Column(db.Integer, db.ForeignKey('workers.id'), nullable=True)
+    date = db.Column(db.Date, nullable=False)
+    revenue = db.Column(db.Float, default=0.0, nullable=False)
+    hours = db.Column(db.Float, default=0.0, nullable=False)
+    entry_count = db.Column(db.Integer, default=0, nullable=False)
+    
+    def __repr__(self):
+        return f'<DailyTotal {self.date} worker {self.worker_id} - ${self.revenue}>'
+
+
 class Worker(db.Model):
     """Worker model for managing workers"""
     __tablename__ = 'workers'
+    __table_args__ = (
+        db.Index('ix_workers_user_name', 'user_id', 'name'),
+    )
     
     id = db.Column(db.Integer, primary_key=True)
     name = db.Column(db.String(100), nullable=False)
@@ -61,12 +95,65 @@ class Worker(db.Model):
     
     # Relationships
     user = db.relationship('User', backref='workers')
-    # Note: Entry stores worker_name as string, not a foreign key relationship
     
     def __repr__(self):
         return f'<Worker {self.name}>'
 
 
+class Holiday(db.Model):
+    """Closure day excluded from a user's workday calendar"""
+    __tablename__ = 'holidays'
+    __table_args__ = (
+        db.UniqueConstraint('user_id', 'date', name='uq_holidays_user_date'),
+    )
+    
+    id = db.Column(db.Integer, primary_key=True)
+    user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False)
+    date = db.Column(db.Date, nullable=False)
+    name = db.Column(db.String(100), nullable=True)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    
+    def __repr__(self):
+        return f'<Holiday {self.date} {self.name}>'
+
+
+class IdempotencyKey(db.Model):
+    """Response of a batch API request, replayed when the client retries with the same key"""
+    __tablename__ = 'idempotency_keys'
+    __table_args__ = (
+        db.UniqueConstraint('user_id', 'key', name='uq_idempotency_keys_user_key'),
+    )
+    
+    id = db.Column(db.Integer, primary_key=True)
+    user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False)
+    key = db.Column(db.String(100), nullable=False)
+    request_hash = db.Column(db.String(64), nullable=False)
+    status_code = db.Column(db.Integer, nullable=False)
+    response_body = db.Column(db.Text, nullable=False)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    
+    def __repr__(self):
+        return f'<IdempotencyKey {self.key}>'
+
+
+class BackfillCheckpoint(db.Model):
+    """Progress of a chunked data backfill, so an interrupted run resumes where it stopped"""
+    __tablename__ = 'backfill_checkpoints'
+    
+    id = db.Column(db.Integer, primary_key=True)
+    name = db.Column(db.String(100), unique=True, nullable=False)
+    table_name = db.Column(db.String(100), nullable=False)
+    last_id = db.Column(db.Integer, default=0, nullable=False)  # Highest primary key processed
+    rows_processed = db.Column(db.Integer, default=0, nullable=False)
+    rows_changed = db.Column(db.Integer, default=0, nullable=False)
+    started_at = db.Column(db.DateTime, default=datetime.utcnow)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    completed_at = db.Column(db.DateTime, nullable=True)
+    
+    def __repr__(self):
+        return f'<BackfillCheckpoint {self.name} at id {self.last_id}>'
+
+
 class Settings(db.Model):
     """User settings for percentage configuration and goals"""
     __tablename__ = 'settings'
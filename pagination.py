@@ -0,0 +1,82 @@
+"""
+Keyset (seek) pagination for date-ordered listings.
+
+Pages are ordered by (date DESC, id DESC) and addressed by an opaque cursor
+holding the (date, id) of the row at the page boundary, so fetching a page
+is an index seek no matter how deep into the history it is, and no
+COUNT(*) is needed to know whether more pages exist.
+"""
+import base64
+from datetime import date
+from sqlalchemy import tuple_
+
+
+class KeysetPage:
+    """One page of results plus the cursors needed to move to its neighbours"""
+
+    def __init__(self, items, has_next, has_prev, per_page):
+        self.items = items
+        self.has_next = has_next
+        self.has_prev = has_prev
+        self.per_page = per_page
+
+    @property
+    def next_cursor(self):
+        """Cursor for the page after this one (older rows), or None"""
+        return encode_cursor(self.items[-1]) if self.has_next and self.items else None
+
+    @property
+    def prev_cursor(self):
+        """Cursor for the page before this one (newer rows), or None"""
+        return encode_cursor(self.items[0]) if self.has_prev and self.items else None
+
+
+def encode_cursor(row):
+    """Encode a row's (date, id) position as an opaque URL-safe token"""
+    raw = f"{row.date.isoformat()}:{row.id}".encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip('=')
+
+
+def decode_cursor(token):
+    """Decode a cursor token into a (date, id) tuple, or None if it is malformed"""
+    if not token:
+        return None
+    try:
+        raw = base64.urlsafe_b64decode(token + '=' * (-len(token) % 4)).decode()
+        day, row_id = raw.split(':')
+        return date.fromisoformat(day), int(row_id)
+    except (ValueError, UnicodeDecodeError):
+        return None
+
+
+def keyset_paginate(query, model, per_page, after=None, before=None):
+    """Fetch one page of query ordered by (date DESC, id DESC).
+
+    Args:
+        query: Filtered query over model
+        model: Mapped class with date and id columns
+        per_page: Rows per page
+        after: Cursor token; return the rows following it (older)
+        before: Cursor token; return the rows preceding it (newer)
+
+    Returns:
+        KeysetPage
+    """
+    position = tuple_(model.date, model.id)
+    after_key = decode_cursor(after)
+    before_key = decode_cursor(before)
+
+    if before_key is not None:
+        # Walk backwards towards newer rows, then restore display order
+        rows = query.filter(position > before_key).order_by(
+            model.date.asc(), model.id.asc()
+        ).limit(per_page + 1).all()
+        has_prev = len(rows) > per_page
+        items = list(reversed(rows[:per_page]))
+        return KeysetPage(items, has_next=True, has_prev=has_prev, per_page=per_page)
+
+    if after_key is not None:
+        query = query.filter(position < after_key)
+    rows = query.order_by(model.date.desc(), model.id.desc()).limit(per_page + 1).all()
+    has_next = len(rows) > per_page
+    return KeysetPage(rows[:per_page], has_next=has_next, has_prev=after_key is not None, per_page=per_page)
@@ -0,0 +1,198 @@
+"""
+On-demand request profiler for admins.
+
+An admin adds ?_profile=1 to a URL (or sends the header "X-Profile: 1") and
+that one request runs under cProfile: the view, the SQL it runs and the
+template rendering, computed afresh (no 304, no result cache). The profile
+is saved to PROFILE_DIR as:
+
+    <id>.prof       pstats dump (python -m pstats, snakeviz, ...)
+    <id>.collapsed  folded stacks for flamegraph.pl / speedscope
+    <id>.json       what was profiled: path, user, status, wall time
+
+Requests from anyone not in ADMIN_USERNAMES ignore the switch. cProfile
+follows only the thread serving the request, and a streamed body (the
+entries export) is profiled up to the start of the response.
+"""
+import cProfile
+import io
+import json
+import os
+import pstats
+import re
+import time
+from datetime import datetime
+from pathlib import Path
+from flask import g, request
+from flask_login import current_user
+
+PROFILE_PARAMETER = '_profile'
+PROFILE_HEADER = 'X-Profile'
+PROFILE_ID_PATTERN = re.compile(r'^[0-9]{8}-[0-9]{6}-[0-9]{6}-[A-Za-z0-9_.]+$')
+# Call paths below this many microseconds are left out of the collapsed stacks
+MIN_COLLAPSED_MICROSECONDS = 10
+MAX_STACK_DEPTH = 200
+
+
+def is_admin(app, user):
+    """Whether a user may profile requests and see the profiles"""
+    return bool(user and user.is_authenticated and user.username in app.config['ADMIN_USERNAMES'])
+
+
+def profiling_requested():
+    return request.args.get(PROFILE_PARAMETER) == '1' or request.headers.get(PROFILE_HEADER) == '1'
+
+
+def is_profiling():
+    """Whether the current request is being profiled (it then skips caches, so the real work is measured)"""
+    return g.get('profiler') is not None
+
+
+def _frame_label(func):
+    """pstats function key (file, line, name) as one flame-graph frame"""
+    filename, line, name = func
+    if filename == '~':
+        return name.replace(';', ',')  # Built-ins: "<built-in method ...>"
+    return f'{name} ({os.path.basename(filename)}:{line})'.replace(';', ',')
+
+
+def collapsed_stacks(stats):
+    """Folded stacks ("frame;frame;frame microseconds" lines) from pstats data.
+
+    cProfile keeps caller -> callee totals, not whole stacks, so each
+    function's own time is split over the paths leading to it in proportion
+    to the time each caller spent calling it.
+    """
+    callees = {}
+    for func, (_, _, _, _, callers) in stats.items():
+        for caller, edge in callers.items():
+            callees.setdefault(caller, []).append((func, edge[3]))
+    roots = [func for func, (_, _, _, _, callers) in stats.items() if not callers]
+
+    folded = {}
+    # (function, share of its cumulative time on this path, path so far)
+    pending = [(func, stats[func][3], ()) for func in roots]
+    while pending:
+        func, seconds, path = pending.pop()
+        _, _, own, cumulative, _ = stats[func]
+        if cumulative <= 0 or seconds * 1e6 < MIN_COLLAPSED_MICROSECONDS:
+            continue
+        path = path + (_frame_label(func),)
+        share = min(seconds / cumulative, 1.0)
+        key = ';'.join(path)
+        folded[key] = folded.get(key, 0) + own * share
+        if len(path) >= MAX_STACK_DEPTH:
+            continue
+        for callee, edge_seconds in callees.get(func, ()):
+            if _frame_label(callee) not in path:  # Recursion is folded into the first frame
+                pending.append((callee, edge_seconds * share, path))
+    return [f'{stack} {round(seconds * 1e6)}' for stack, seconds in sorted(folded.items())
+            if round(seconds * 1e6) > 0]
+
+
+def _save_profile(profile_dir, profiler, meta):
+    profile_dir.mkdir(parents=True, exist_ok=True)
+    profile_id = f"{datetime.now().strftime('%Y%m%d-%H%M%S-%f')}-{re.sub(r'[^A-Za-z0-9_.]', '_', meta['endpoint'])}"
+    profiler.dump_stats(profile_dir / f'{profile_id}.prof')
+    stats = pstats.Stats(profiler).stats
+    (profile_dir / f'{profile_id}.collapsed').write_text('\n'.join(collapsed_stacks(stats)) + '\n')
+    (profile_dir / f'{profile_id}.json').write_text(json.dumps(meta, indent=2))
+    return profile_id
+
+
+def _prune(profile_dir, keep):
+    """Delete all but the newest `keep` profiles"""
+    for meta_path in sorted(profile_dir.glob('*.json'), reverse=True)[keep:]:
+        for suffix in ('.prof', '.collapsed', '.json'):
+            meta_path.with_suffix(suffix).unlink(missing_ok=True)
+
+
+def profile_path(profile_dir, profile_id, suffix):
+    """Path of one file of a saved profile, or None if the id is not a valid, existing profile"""
+    if not PROFILE_ID_PATTERN.match(profile_id) or suffix not in ('.prof', '.collapsed', '.json'):
+        return None
+    path = Path(profile_dir) / f'{profile_id}{suffix}'
+    return path if path.is_file() else None
+
+
+def get_profile(profile_dir, profile_id):
+    """Metadata of a saved profile plus its 'id', or None"""
+    path = profile_path(profile_dir, profile_id, '.json')
+    if path is None:
+        return None
+    try:
+        meta = json.loads(path.read_text())
+    except (OSError, ValueError):
+        return None
+    meta['id'] = profile_id
+    return meta
+
+
+def list_profiles(profile_dir, limit=None):
+    """Saved profiles, newest first"""
+    profile_dir = Path(profile_dir)
+    if not profile_dir.is_dir():
+        return []
+    profiles = (get_profile(profile_dir, meta_path.stem)
+                for meta_path in sorted(profile_dir.glob('*.json'), reverse=True)[:limit])
+    return [meta for meta in profiles if meta is not None]
+
+
+def profile_summary(profile_dir, profile_id, limit=40):
+    """pstats report of a saved profile (top functions by cumulative time) as text"""
+    path = profile_path(profile_dir, profile_id, '.prof')
+    if path is None:
+        return None
+    out = io.StringIO()
+    pstats.Stats(str(path), stream=out).strip_dirs().sort_stats('cumulative').print_stats(limit)
+    return out.getvalue()
+
+
+def init_profiler(app):
+    """Profile requests that ask for it, when an admin sends them"""
+    profile_dir = Path(app.config['PROFILE_DIR'])
+
+    @app.before_request
+    def _start_profile():
+        if not profiling_requested() or not is_admin(app, current_user):
+            return
+        profiler = cProfile.Profile()
+        try:
+            profiler.enable()
+        except ValueError:
+            # Another profiler is active (Python 3.12+ allows only one at a time)
+            app.logger.warning('Profile of %s skipped: another profile is running', request.path)
+            return
+        g.profiler = (profiler, time.perf_counter())
+
+    @app.after_request
+    def _save_request_profile(response):
+        started = g.pop('profiler', None)
+        if started is None:
+            return response
+        profiler, started_at = started
+        profiler.disable()
+        meta = {
+            'created': datetime.now().isoformat(timespec='seconds'),
+            'method': request.method,
+            'path': request.full_path.rstrip('?'),
+            'endpoint': request.endpoint or 'unmatched',
+            'user': current_user.username,
+            'status': response.status_code,
+            'wall_ms': round((time.perf_counter() - started_at) * 1000, 1)
+        }
+        try:
+            profile_id = _save_profile(profile_dir, profiler, meta)
+            _prune(profile_dir, app.config['PROFILE_KEEP'])
+        except OSError as e:
+            app.logger.warning('Could not save profile of %s: %s', request.path, e)
+            return response
+        response.headers['X-Profile-Id'] = profile_id
+        return response
+
+    @app.teardown_request
+    def _stop_failed_profile(exc):
+        # after_request does not run when a view raises; don't leave the profiler on
+        started = g.pop('profiler', None)
+        if started is not None:
+            started[0].disable()
@@ -0,0 +1,186 @@
+"""
+Maintenance of the daily_totals rollup table.
+
+Every code path that writes to entries calls into this module inside the
+same session, so the rollup is committed (or rolled back) together with the
+entry change it reflects. Paths that edit or delete existing entries load
+them through lock_entries() first, so the amounts they take out of the
+rollup are the ones actually stored.
+"""
+from datetime import datetime
+from sqlalchemy import bindparam, delete, func, insert, select, update
+from models import db, Entry, DailyTotal, Settings
+
+# Days looked up per query in apply_deltas (stays well under SQLite's bound-parameter limit)
+DELTA_LOOKUP_CHUNK = 500
+
+
+def apply_delta(user_id, worker_id, day, revenue, hours, count):
+    """Add (or subtract) amounts from the rollup row for (user, worker, day)"""
+    apply_deltas(user_id, {(worker_id, day): [revenue, hours, count]})
+
+
+def apply_deltas(user_id, deltas):
+    """Apply rollup changes for one user.
+
+    Args:
+        user_id: Owner of the entries
+        deltas: Dict mapping (worker_id, date) to [revenue, hours, count] to add
+
+    The amounts are added in SQL (revenue = revenue + ?), never read into
+    Python and written back, so concurrent writers to the same day cannot
+    overwrite each other. The UPDATE comes first and takes SQLite's write
+    lock, so the lookup of days that still need a row is not racing anyone
+    either. Works on the table directly: DailyTotal objects already loaded
+    in the session are not refreshed.
+    """
+    if not deltas:
+        return
+    table = DailyTotal.__table__
+    result = db.session.execute(
+        update(table).where(
+            table.c.user_id == user_id,
+            table.c.worker_id.is_(bindparam('k_worker_id')),  # IS, so rows without a worker match too
+            table.c.date == bindparam('k_date')
+        ).values(
+            revenue=table.c.revenue + bindparam('d_revenue'),
+            hours=table.c.hours + bindparam('d_hours'),
+            entry_count=table.c.entry_count + bindparam('d_count')
+        ),
+        [{'k_worker_id': worker_id, 'k_date': day, 'd_revenue': revenue, 'd_hours': hours, 'd_count': count}
+         for (worker_id, day), (revenue, hours, count) in deltas.items()]
+    )
+
+    if result.rowcount < len(deltas):
+        # Some days have no rollup row yet
+        days = sorted({day for _, day in deltas})
+        existing = set()
+        for start in range(0, len(days), DELTA_LOOKUP_CHUNK):
+            rows = db.session.execute(
+                select(table.c.worker_id, table.c.date).where(
+                    table.c.user_id == user_id,
+                    table.c.date.in_(days[start:start + DELTA_LOOKUP_CHUNK])
+                )
+            )
+            existing.update((row.worker_id, row.date) for row in rows)
+        inserts = [{'user_id': user_id, 'worker_id': worker_id, 'date': day,
+                    'revenue': revenue, 'hours': hours, 'entry_count': count}
+                   for (worker_id, day), (revenue, hours, count) in deltas.items()
+                   if (worker_id, day) not in existing and count > 0]
+        if inserts:
+            db.session.execute(insert(table), inserts)
+
+    if any(count < 0 for _, _, count in deltas.values()):
+        db.session.execute(
+            delete(table).where(table.c.user_id == user_id, table.c.entry_count <= 0)
+        )
+
+
+def lock_entries(user_id, entry_ids):
+    """Take the database write lock, then load a user's entries as they are now.
+
+    Entries read earlier in the request may be stale: another request can
+    have edited or deleted them since (a double-clicked Delete link is
+    enough). Nobody else can change them between this call and the commit,
+    so rollup deltas must be computed from the entries returned here.
+
+    Returns:
+        Dict mapping entry id to Entry, for the ids that still exist
+    """
+    if not entry_ids:
+        return {}
+    table = Entry.__table__
+    ids = list(entry_ids)
+    # Any write takes SQLite's write lock; this one changes nothing
+    db.session.execute(
+        update(table).where(table.c.user_id == user_id, table.c.id.in_(ids))
+        .values(updated_at=table.c.updated_at)
+    )
+    entries = Entry.query.filter(Entry.user_id == user_id, Entry.id.in_(ids)).execution_options(
+        populate_existing=True
+    )
+    return {entry.id: entry for entry in entries}
+
+
+def add_entry(entry):
+    """Record a new (or updated) entry's values in the rollup"""
+    apply_delta(entry.user_id, entry.worker_id, entry.date, entry.revenue, entry.hours, 1)
+
+
+def remove_entry(entry):
+    """Remove an entry's current values from the rollup"""
+    apply_delta(entry.user_id, entry.worker_id, entry.date, -entry.revenue, -entry.hours, -1)
+
+
+def remove_worker(user_id, worker_id):
+    """Drop every rollup row belonging to a worker"""
+    DailyTotal.query.filter_by(user_id=user_id, worker_id=worker_id).delete()
+
+
+def rebuild(user_id=None):
+    """Recompute the rollup from entries (all users, or just one).
+
+    Also bumps the users' settings.updated_at, which is part of the data
+    version, so pages and results cached from the old rollup are not served.
+
+    Returns:
+        Number of rollup rows written
+    """
+    delete_query = DailyTotal.query
+    if user_id is not None:
+        delete_query = delete_query.filter_by(user_id=user_id)
+    delete_query.delete()
+    
+    grouped = select(
+        Entry.user_id,
+        Entry.worker_id,
+        Entry.date,
+        func.sum(Entry.revenue),
+        func.sum(Entry.hours),
+        func.count(Entry.id)
+    ).group_by(Entry.user_id, Entry.worker_id, Entry.date)
+    if user_id is not None:
+        grouped = grouped.where(Entry.user_id == user_id)
+    
+    result = db.session.execute(
+        insert(DailyTotal).from_select(
+            ['user_id', 'worker_id', 'date', 'revenue', 'hours', 'entry_count'],
+            grouped
+        )
+    )
+    touched = update(Settings).values(updated_at=datetime.utcnow())
+    if user_id is not None:
+        touched = touched.where(Settings.user_id == user_id)
+    db.session.execute(touched)
+    db.session.commit()
+    return result.rowcount
+
+
+def find_drift(user_id=None):
+    """Rollup rows that disagree with what rebuild() would write.
+
+    Returns:
+        List of ((user_id, worker_id, date), rollup (revenue, hours, count), entries (revenue, hours, count)),
+        with None for a side that has no row
+    """
+    grouped = select(
+        Entry.user_id, Entry.worker_id, Entry.date,
+        func.sum(Entry.revenue), func.sum(Entry.hours), func.count(Entry.id)
+    ).group_by(Entry.user_id, Entry.worker_id, Entry.date)
+    stored = select(
+        DailyTotal.user_id, DailyTotal.worker_id, DailyTotal.date,
+        DailyTotal.revenue, DailyTotal.hours, DailyTotal.entry_count
+    )
+    if user_id is not None:
+        grouped = grouped.where(Entry.user_id == user_id)
+        stored = stored.where(DailyTotal.user_id == user_id)
+    expected = {tuple(row[:3]): tuple(row[3:]) for row in db.session.execute(grouped)}
+    actual = {tuple(row[:3]): tuple(row[3:]) for row in db.session.execute(stored)}
+
+    def same(a, b):
+        return (a is not None and b is not None and a[2] == b[2]
+                and abs(a[0] - b[0]) < 0.005 and abs(a[1] - b[1]) < 0.005)
+
+    return [(key, actual.get(key), expected.get(key))
+            for key in sorted(set(expected) | set(actual), key=str)
+            if not same(actual.get(key), expected.get(key))]
@@ -0,0 +1,114 @@
+"""
+Schema version check run at startup.
+
+The database records the schema version it was last upgraded to in SQLite's
+PRAGMA user_version. At startup ensure_schema() compares it with
+SCHEMA_VERSION in one query and returns straight away when they match. Only
+an older database goes through the upgrade: create missing tables, then the
+idempotent steps in UPGRADE_STEPS, then the version is stamped.
+
+Any change to the models needs a bump of SCHEMA_VERSION (new tables are then
+created by db.create_all()); changes that create_all() cannot apply to an
+existing table also need a step here.
+"""
+from sqlalchemy import text
+from models import db
+
+SCHEMA_VERSION = 2
+
+
+def get_schema_version(conn):
+    """Schema version stamped on the database (0 for databases from before versioning)"""
+    return conn.execute(text("PRAGMA user_version")).scalar()
+
+
+def _columns(conn, table):
+    """Column names of a table ([] if it doesn't exist)"""
+    return [row[1] for row in conn.execute(text(f"PRAGMA table_info({table})"))]
+
+
+def _link_entries_to_workers(conn):
+    """entries.worker_id and the rollup keyed by it; the data backfill is left to `flask run-backfills`"""
+    from migrations.add_entry_worker_id import needs_worker_id_column, prepare_entry_worker_id
+    if needs_worker_id_column():
+        conn.commit()  # End this connection's read so the step's connection can write
+        prepare_entry_worker_id()
+
+
+def _add_missing_columns(conn):
+    """Model columns missing from existing tables, added with their defaults"""
+    for table in db.metadata.sorted_tables:
+        existing = _columns(conn, table.name)
+        if not existing:
+            continue
+        for column in table.columns:
+            if column.name in existing:
+                continue
+            # SQLite can only add a NOT NULL column together with a constant default
+            definition = column.type.compile(dialect=conn.dialect)
+            default = column.default.arg if column.default is not None and column.default.is_scalar else None
+            if default is not None:
+                definition += f" DEFAULT {int(default) if isinstance(default, bool) else repr(default)}"
+                if not column.nullable:
+                    definition += " NOT NULL"
+            conn.execute(text(f"ALTER TABLE {table.name} ADD COLUMN {column.name} {definition}"))
+            print(f"✓ Column {table.name}.{column.name} added")
+    conn.commit()
+
+
+def _create_missing_indexes(conn):
+    """Model indexes missing from tables created before the index existed"""
+    for table in db.metadata.sorted_tables:
+        for index in table.indexes:
+            index.create(conn, checkfirst=True)
+    # Refresh planner statistics so new indexes get picked
+    conn.execute(text("ANALYZE"))
+    conn.commit()
+    print("✓ Indexes ready")
+
+
+def _fill_daily_totals(conn):
+    """The daily_totals rollup for databases created before it existed"""
+    import rollup
+    has_totals = conn.execute(text("SELECT 1 FROM daily_totals LIMIT 1")).first()
+    has_entries = conn.execute(text("SELECT 1 FROM entries LIMIT 1")).first()
+    conn.commit()  # End the read so the rebuild's session can take the write lock
+    if has_entries and not has_totals:
+        rows = rollup.rebuild()
+        print(f"✓ Daily totals rebuilt ({rows} rows)")
+
+
+# (version, step): each step brings a database up to that version and is safe to re-run
+UPGRADE_STEPS = [
+    (1, _link_entries_to_workers),
+    (1, _add_missing_columns),
+    (1, _create_missing_indexes),
+    (1, _fill_daily_totals),
+    # 2: backfill_checkpoints table, created by db.create_all()
+]
+
+
+def ensure_schema():
+    """Upgrade the database to SCHEMA_VERSION if it is older (must run inside an app context).
+
+    Returns:
+        The version the database was at before the call
+    """
+    with db.engine.connect() as conn:
+        version = get_schema_version(conn)
+    if version == SCHEMA_VERSION:
+        return version
+    if version > SCHEMA_VERSION:
+        print(f"Database schema version {version} is newer than this code expects ({SCHEMA_VERSION}); leaving it alone.")
+        return version
+
+    print(f"Upgrading database schema from version {version} to {SCHEMA_VERSION}...")
+    db.create_all()
+    with db.engine.connect() as conn:
+        for step_version, step in UPGRADE_STEPS:
+            if step_version > version:
+                step(conn)
+        conn.execute(text(f"PRAGMA user_version = {SCHEMA_VERSION}"))
+        conn.commit()
+    print(f"✓ Database schema is at version {SCHEMA_VERSION}")
+    return version
@@ -0,0 +1,99 @@
+"""
+Slow-query log.
+
+Any SQL statement that takes longer than SLOW_QUERY_THRESHOLD_MS is written
+to a rotating log file together with its parameters, the route that ran it
+and SQLite's EXPLAIN QUERY PLAN for it, so a query that starts scanning a
+table as the data grows shows up with the reason attached.
+
+A statement's time includes fetching its rows (sql_timing.py): SQLite does
+most of a large SELECT's work while the rows are read, not in execute().
+The plan is captured as soon as the statement's rows have been read, on the
+same connection, with the same parameters.
+"""
+import logging
+import sqlite3
+from logging.handlers import RotatingFileHandler
+from pathlib import Path
+from flask import has_request_context, request
+from sql_timing import on_statement
+
+MAX_PARAMETERS_LENGTH = 500
+
+logger = logging.getLogger('revenue_dashboard.slow_queries')
+
+
+def _caller():
+    """Route that ran the statement, or where it came from outside a request"""
+    if has_request_context():
+        return f'{request.method} {request.path} ({request.endpoint or "unmatched"})'
+    return 'outside a request (CLI, startup or background job)'
+
+
+def format_plan(rows):
+    """EXPLAIN QUERY PLAN rows (id, parent, notused, detail) as an indented tree"""
+    depth = {0: 0}
+    lines = []
+    for node_id, parent, _, detail in rows:
+        depth[node_id] = depth.get(parent, 0) + 1
+        lines.append('  ' * depth[node_id] + detail)
+    return lines
+
+
+def explain(dbapi_connection, statement, parameters):
+    """EXPLAIN QUERY PLAN of a statement as text lines (an explanation of the failure if it can't be planned)"""
+    # A plain sqlite3 cursor: not counted by metrics and not seen by SQLAlchemy events
+    cursor = dbapi_connection.cursor(sqlite3.Cursor)
+    try:
+        cursor.execute(f'EXPLAIN QUERY PLAN {statement}', parameters)
+        return format_plan(cursor.fetchall())
+    except Exception as e:
+        return [f'(no plan: {e})']
+    finally:
+        cursor.close()
+
+
+def _log_slow_query(dbapi_connection, elapsed, statement, parameters, executemany):
+    if executemany:
+        # Plan the statement once; every parameter set runs the same plan
+        batch_size = len(parameters)
+        parameters = parameters[0] if parameters else ()
+    plan = explain(dbapi_connection, statement, parameters) if dbapi_connection is not None else []
+    shown = repr(parameters)
+    if len(shown) > MAX_PARAMETERS_LENGTH:
+        shown = shown[:MAX_PARAMETERS_LENGTH] + '...'
+    lines = [
+        f'{elapsed * 1000:.1f} ms  {_caller()}',
+        f'  SQL: {" ".join(statement.split())}',
+        f'  Parameters: {shown}' + (f' (first of {batch_size} sets)' if executemany else ''),
+        '  Plan:'
+    ] + ['  ' + line for line in plan]
+    logger.warning('\n'.join(lines))
+
+
+def init_slow_query_log(app, db):
+    """Log statements slower than SLOW_QUERY_THRESHOLD_MS to SLOW_QUERY_LOG (off when the threshold is unset)"""
+    threshold_ms = app.config.get('SLOW_QUERY_THRESHOLD_MS')
+    if not threshold_ms:
+        return
+    threshold = threshold_ms / 1000
+    with app.app_context():
+        engine = db.engine
+    if engine.dialect.name != 'sqlite':
+        return
+
+    log_path = Path(app.config['SLOW_QUERY_LOG'])
+    log_path.parent.mkdir(parents=True, exist_ok=True)
+    handler = RotatingFileHandler(log_path, maxBytes=app.config['SLOW_QUERY_LOG_MAX_BYTES'],
+                                  backupCount=app.config['SLOW_QUERY_LOG_BACKUPS'], encoding='utf-8')
+    handler.setFormatter(logging.Formatter('%(asctime)s [pid %(process)d] %(message)s'))
+    logger.addHandler(handler)
+    logger.setLevel(logging.WARNING)
+    logger.propagate = False
+
+    def _check_duration(timing):
+        if timing.seconds >= threshold:
+            _log_slow_query(timing.dbapi_connection, timing.seconds, timing.statement, timing.parameters,
+                            timing.executemany)
+
+    on_statement(engine, _check_duration)
@@ -0,0 +1,120 @@
+"""
+Timing of SQL statements, including fetching their rows.
+
+SQLite only steps to the first row inside cursor.execute(); the rest of a
+SELECT's work happens while its rows are fetched. before/after_cursor_execute
+alone therefore see even a large read as almost free. The engine's SQLite
+connections hand out TimedCursor objects instead, which add the time spent
+in fetchone/fetchmany/fetchall, and the statement is reported to the
+registered listeners when its cursor is closed (SQLAlchemy closes it as soon
+as the result is exhausted or discarded). Statements that return no rows are
+reported right after execute.
+
+Listeners are called with a StatementTiming in the thread that ran the
+statement, so request context (flask.g, request) is available as usual.
+"""
+import sqlite3
+import time
+import weakref
+from sqlalchemy import event
+
+# engine -> [listener(timing)]
+_listeners = weakref.WeakKeyDictionary()
+
+
+class StatementTiming:
+    """One statement: its SQL, parameters, seconds spent executing and fetching, rows fetched"""
+
+    __slots__ = ('statement', 'parameters', 'executemany', 'seconds', 'rows', 'dbapi_connection', '_engine')
+
+    def __init__(self, engine, dbapi_connection, statement, parameters, executemany, seconds):
+        self._engine = engine
+        self.dbapi_connection = dbapi_connection
+        self.statement = statement
+        self.parameters = parameters
+        self.executemany = executemany
+        self.seconds = seconds
+        self.rows = 0
+
+    def finish(self):
+        for listener in _listeners.get(self._engine, ()):
+            listener(self)
+
+
+class TimedCursor(sqlite3.Cursor):
+    """sqlite3 cursor that adds its fetch time and row count to the statement's timing"""
+
+    timing = None
+
+    def _fetched(self, started, rows):
+        timing = self.timing
+        if timing is not None:
+            timing.seconds += time.perf_counter() - started
+            timing.rows += rows
+
+    def _finish(self):
+        timing = self.timing
+        if timing is not None:
+            self.timing = None
+            timing.finish()
+
+    def fetchone(self):
+        started = time.perf_counter()
+        row = super().fetchone()
+        self._fetched(started, 0 if row is None else 1)
+        return row
+
+    def fetchmany(self, *args, **kwargs):
+        started = time.perf_counter()
+        rows = super().fetchmany(*args, **kwargs)
+        self._fetched(started, len(rows))
+        return rows
+
+    def fetchall(self):
+        started = time.perf_counter()
+        rows = super().fetchall()
+        self._fetched(started, len(rows))
+        return rows
+
+    def close(self):
+        self._finish()
+        super().close()
+
+
+class TimedConnection(sqlite3.Connection):
+    def cursor(self, factory=TimedCursor):
+        return super().cursor(factory)
+
+
+def on_statement(engine, listener):
+    """Call listener(timing) for every statement the engine runs, once its rows are fetched"""
+    if engine in _listeners:
+        _listeners[engine].append(listener)
+        return
+    _listeners[engine] = [listener]
+
+    @event.listens_for(engine, 'before_cursor_execute')
+    def _start_timer(conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault('statement_started', []).append(time.perf_counter())
+
+    @event.listens_for(engine, 'after_cursor_execute')
+    def _executed(conn, cursor, statement, parameters, context, executemany):
+        elapsed = time.perf_counter() - conn.info['statement_started'].pop()
+        timing = StatementTiming(engine, cursor.connection, statement, parameters, executemany, elapsed)
+        if isinstance(cursor, TimedCursor) and cursor.description is not None:
+            cursor._finish()  # A cursor reused without being closed
+            cursor.timing = timing
+        else:
+            timing.finish()
+
+    @event.listens_for(engine, 'handle_error')
+    def _drop_timer(context):
+        # after_cursor_execute is skipped when a statement fails
+        started = context.connection.info.get('statement_started') if context.connection is not None else None
+        if started:
+            started.pop()
+
+    if engine.dialect.name == 'sqlite' and engine.dialect.driver == 'pysqlite':
+        @event.listens_for(engine, 'do_connect')
+        def _timed_connection(dialect, connection_record, cargs, cparams):
+            cparams.setdefault('factory', TimedConnection)
@@ -0,0 +1,38 @@
+"""
+Connection-level tuning for SQLite.
+
+SQLite keeps most of its performance settings per connection, so the PRAGMA
+profile in the SQLITE_PRAGMAS config is applied to every new connection the
+engine opens. Pooled connections then all behave the same, whichever thread
+or worker process opened them.
+"""
+from sqlalchemy import event
+
+
+def pragma_statements(pragmas):
+    """PRAGMA statements for a {name: value} profile, busy_timeout first so the rest can wait for locks"""
+    names = sorted(pragmas, key=lambda name: name != 'busy_timeout')
+    return [f'PRAGMA {name} = {pragmas[name]}' for name in names if pragmas[name] is not None]
+
+
+def init_sqlite_tuning(app, db):
+    """Apply app.config['SQLITE_PRAGMAS'] on every new connection of the app's SQLite engine"""
+    statements = pragma_statements(app.config.get('SQLITE_PRAGMAS') or {})
+    with app.app_context():
+        engine = db.engine
+    if engine.dialect.name != 'sqlite' or not statements:
+        return
+
+    @event.listens_for(engine, 'connect')
+    def _apply_pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        try:
+            for statement in statements:
+                cursor.execute(statement)
+        finally:
+            cursor.close()
+
+
+def current_pragmas(connection, names):
+    """{name: value} of the given PRAGMAs as seen by a connection, for checking the profile took effect"""
+    return {name: connection.exec_driver_sql(f'PRAGMA {name}').scalar() for name in names}
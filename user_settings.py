@@ -0,0 +1,95 @@
+"""
+Per-request access to a user's settings.
+
+Pages read settings through get_settings(), which loads them at most once
+per request (kept on flask.g) and otherwise serves a read-only snapshot from
+a small per-user cache. Missing rows and NULL columns are filled with
+defaults in the snapshot, so reading settings never writes to the database.
+The settings page edits the row via get_settings_row() and calls
+invalidate_settings() after saving.
+"""
+from flask import g
+from models import db, Settings
+from workdays import parse_workdays
+from cache import LRUCache
+
+# Users whose settings snapshots are kept in memory, and for how long (seconds). Each
+# worker process has its own cache, so the TTL bounds how long another process can
+# keep showing settings from before a save.
+SETTINGS_CACHE_SIZE = 128
+SETTINGS_CACHE_TTL = 60
+
+DEFAULTS = {
+    'tax_percent': 0.0,
+    'reinvest_percent': 0.0,
+    'take_home_percent': 100.0,
+    'default_worker_id': None,
+    'currency_symbol': '$',
+    'daily_revenue_goal': 0.0,
+    'monthly_revenue_goal': 0.0,
+    'monthly_take_home_goal': 0.0,
+    'target_days_per_month': 0,
+    'profit_quota': 0.0,
+    'loss_quota': 0.0,
+    'workdays_of_week': '0,1,2,3,4',
+}
+
+settings_cache = LRUCache(SETTINGS_CACHE_SIZE, ttl=SETTINGS_CACHE_TTL)
+
+
+class UserSettings:
+    """Read-only snapshot of a user's settings with defaults filled in"""
+
+    def __init__(self, user_id, values, updated_at=None):
+        self.user_id = user_id
+        self.updated_at = updated_at
+        for field, default in DEFAULTS.items():
+            value = values.get(field)
+            setattr(self, field, default if value is None else value)
+        # Parsed once here instead of on every use
+        self.workdays = parse_workdays(self.workdays_of_week) or parse_workdays(DEFAULTS['workdays_of_week'])
+
+    def __repr__(self):
+        return f'<UserSettings User {self.user_id}>'
+
+
+def load_settings(user_id):
+    """Read a user's settings from the database (defaults if they have no row yet)"""
+    row = Settings.query.filter_by(user_id=user_id).first()
+    if row is None:
+        return UserSettings(user_id, {})
+    return UserSettings(user_id, {field: getattr(row, field) for field in DEFAULTS}, row.updated_at)
+
+
+def get_settings(user_id):
+    """The user's settings for this request: from g, else the per-user cache, else the database"""
+    snapshot = g.get('user_settings')
+    if snapshot is not None and snapshot.user_id == user_id:
+        return snapshot
+    key = (user_id, 'settings')
+    snapshot = settings_cache.get(key)
+    if snapshot is None:
+        snapshot = load_settings(user_id)
+        settings_cache.set(key, snapshot)
+    g.user_settings = snapshot
+    return snapshot
+
+
+def get_settings_row(user_id):
+    """The user's Settings row for editing, added to the session (not committed) if missing"""
+    row = Settings.query.filter_by(user_id=user_id).first()
+    if row is None:
+        row = Settings(user_id=user_id, **DEFAULTS)
+        db.session.add(row)
+    else:
+        # Rows from before a column existed may still hold NULLs
+        for field, default in DEFAULTS.items():
+            if default is not None and getattr(row, field) is None:
+                setattr(row, field, default)
+    return row
+
+
+def invalidate_settings(user_id):
+    """Forget cached settings after the user's settings row changed"""
+    settings_cache.invalidate_user(user_id)
+    g.pop('user_settings', None)
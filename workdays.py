@@ -0,0 +1,108 @@
+"""
+Workday calendar arithmetic.
+
+Workdays in a range are counted from whole weeks plus at most six leftover
+days, so the cost does not depend on the length of the range. Holidays
+(closure days) are passed in as a sorted list of dates and subtracted with
+binary search.
+"""
+from bisect import bisect_left, bisect_right
+from calendar import monthrange
+from datetime import date
+from functools import lru_cache
+
+DEFAULT_WORKDAYS = (0, 1, 2, 3, 4)  # Mon-Fri
+
+
+def parse_workdays(value):
+    """Parse a '0,1,2,3,4' settings string into a tuple of weekday numbers (None if unusable)"""
+    if not value:
+        return None
+    try:
+        workdays = tuple(sorted({int(d.strip()) for d in value.split(',') if d.strip()}))
+    except (ValueError, AttributeError):
+        return None
+    return workdays or None
+
+
+def _normalize(workdays_of_week):
+    """Turn any iterable of weekday numbers into a hashable, sorted tuple"""
+    if workdays_of_week is None:
+        return DEFAULT_WORKDAYS
+    return tuple(sorted(set(workdays_of_week)))
+
+
+@lru_cache(maxsize=64)
+def _week_pattern(workdays):
+    """7-element tuple of 0/1 flags, indexed by weekday"""
+    return tuple(1 if day in workdays else 0 for day in range(7))
+
+
+def _count_weekdays(start_date, end_date, workdays):
+    """Count dates in [start_date, end_date] whose weekday is in workdays, ignoring holidays"""
+    if start_date > end_date:
+        return 0
+    total_days = (end_date - start_date).days + 1
+    full_weeks, leftover = divmod(total_days, 7)
+    pattern = _week_pattern(workdays)
+    first_weekday = start_date.weekday()
+    count = full_weeks * sum(pattern)
+    for offset in range(leftover):
+        count += pattern[(first_weekday + offset) % 7]
+    return count
+
+
+@lru_cache(maxsize=512)
+def _month_total(year, month, workdays):
+    """Nominal workdays in a calendar month (memoized per (year, month, workdays))"""
+    last_day = monthrange(year, month)[1]
+    return _count_weekdays(date(year, month, 1), date(year, month, last_day), workdays)
+
+
+def _count_holidays(start_date, end_date, workdays, holidays):
+    """Count holidays within [start_date, end_date] that fall on a workday"""
+    if not holidays:
+        return 0
+    lo = bisect_left(holidays, start_date)
+    hi = bisect_right(holidays, end_date)
+    return sum(1 for day in holidays[lo:hi] if day.weekday() in workdays)
+
+
+def count_workdays(start_date, end_date, workdays_of_week=None, holidays=None):
+    """Count workdays between two dates inclusive based on specified days of week.
+
+    Args:
+        start_date: Start date
+        end_date: End date
+        workdays_of_week: List of weekday numbers (0=Monday, 6=Sunday) or None for default Mon-Fri
+        holidays: Sorted list of closure dates to exclude, or None
+    """
+    workdays = _normalize(workdays_of_week)
+    return (_count_weekdays(start_date, end_date, workdays)
+            - _count_holidays(start_date, end_date, workdays, holidays))
+
+
+def get_month_workday_stats(reference_date=None, workdays_of_week=None, holidays=None):
+    """Return total, passed, and remaining nominal workdays for the month of reference_date.
+
+    Args:
+        reference_date: Date to calculate from (defaults to today)
+        workdays_of_week: List of weekday numbers (0=Monday, 6=Sunday) or None for default Mon-Fri
+        holidays: Sorted list of closure dates to exclude, or None
+    """
+    if reference_date is None:
+        reference_date = date.today()
+    workdays = _normalize(workdays_of_week)
+    year, month = reference_date.year, reference_date.month
+    month_start = date(year, month, 1)
+    month_end = date(year, month, monthrange(year, month)[1])
+
+    total_workdays = (_month_total(year, month, workdays)
+                      - _count_holidays(month_start, month_end, workdays, holidays))
+    remaining_workdays = count_workdays(reference_date, month_end, workdays, holidays)
+    workdays_passed = max(total_workdays - remaining_workdays, 0)
+    return {
+        'total': total_workdays,
+        'passed': workdays_passed,
+        'remaining': remaining_workdays
+    }
@@ -0,0 +1,8 @@
+"""
+WSGI entry point for production servers
+gunicorn loads this through gunicorn.conf.py; any other WSGI server can use
+`wsgi:application` directly.
+"""
+from app import create_app
+
+application = create_app()